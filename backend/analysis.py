@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from bson import ObjectId
+from compaction import compact_prompt
+from config import Config
+from database import get_database
+
+db = get_database()
+logger = logging.getLogger(__name__)
+
+PROMPT_HEADER = ("Analyze the following summary of my transactions and provide useful insights, "
+                 "including identifying potentially useless transactions or suggesting alternatives. "
+                 "Amounts are in dollars; expenses are negative in the transaction list.")
+
+_client = None
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+class StubClient:
+    """Offline stand-in for the OpenAI client with the same call shape."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.calls.append({'model': model, 'messages': messages, **kwargs})
+        prompt = messages[-1]['content']
+        lines = prompt.count('\n') - PROMPT_HEADER.count('\n')
+        content = f"Stub analysis of {lines} lines (sha256 {hashlib.sha256(prompt.encode()).hexdigest()[:12]})"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def get_llm_client():
+    # Built on first use so importing the app never needs an API key
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if Config.LLM_CLIENT == 'stub':
+                    _client = StubClient()
+                else:
+                    from openai import OpenAI
+                    _client = OpenAI(api_key=Config.OPENAI_API_KEY)
+    return _client
+
+
+def get_executor():
+    # Worker threads do not survive a fork, so each process starts its own pool
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.ANALYSIS_WORKERS, thread_name_prefix='analysis')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def window_query(user_id, days=None, since=None):
+    # Filter and projection of the history window, shared with the ASGI app
+    if since is None:
+        since = datetime.now() - timedelta(days=days or Config.ANALYSIS_HISTORY_DAYS)
+    return ({'userId': user_id, 'date': {'$gte': since}},
+            {'_id': 0, 'date': 1, 'description': 1, 'category': 1, 'amount': 1})
+
+
+def load_window(user_id, days=None, since=None):
+    return list(db.transactions.find(*window_query(user_id, days, since)).sort('date', -1))
+
+
+def build_prompt(transactions, token_budget=None):
+    # The whole history window is aggregated, then trimmed to the budget
+    return compact_prompt(PROMPT_HEADER, transactions,
+                          token_budget or Config.ANALYSIS_TOKEN_BUDGET, Config.LLM_MODEL)
+
+
+def prompt_hash(prompt):
+    # The prompt is derived from the transaction window, so any new, edited
+    # or deleted transaction inside it yields a new hash and a cache miss
+    return hashlib.sha256(f"{Config.LLM_MODEL}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+def get_cached(user_id, input_hash):
+    entry = db.analysis_cache.find_one({'userId': user_id, 'inputHash': input_hash})
+    return entry['analysis'] if entry else None
+
+
+def run_analysis(user_id, prompt, input_hash):
+    response = get_llm_client().chat.completions.create(
+        model=Config.LLM_MODEL,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    analysis = response.choices[0].message.content
+    db.analysis_cache.update_one(
+        {'userId': user_id, 'inputHash': input_hash},
+        {'$set': {'analysis': analysis, 'createdAt': datetime.now()}},
+        upsert=True)
+    return analysis
+
+
+def submit_job(user_id, prompt, input_hash):
+    """Queue an analysis and return its job document.
+
+    A job already queued or running for the same input is reused instead of
+    paying for a second identical completion, unless it is older than
+    ANALYSIS_JOB_STALE_SECONDS: its worker has then died or been recycled,
+    so it is marked failed and a new job takes its place.
+    """
+    pending = {'userId': user_id, 'inputHash': input_hash,
+               'status': {'$in': ['queued', 'running']}}
+    stale_before = datetime.now() - timedelta(seconds=Config.ANALYSIS_JOB_STALE_SECONDS)
+    existing = db.analysis_jobs.find_one({**pending, 'createdAt': {'$gte': stale_before}})
+    if existing:
+        return existing
+    db.analysis_jobs.update_many(
+        {**pending, 'createdAt': {'$lt': stale_before}},
+        {'$set': {'status': 'failed', 'error': 'Job was abandoned', 'finishedAt': datetime.now()}})
+
+    job = {
+        '_id': ObjectId(),
+        'userId': user_id,
+        'inputHash': input_hash,
+        'status': 'queued',
+        'createdAt': datetime.now()
+    }
+    db.analysis_jobs.insert_one(job)
+    get_executor().submit(_run_job, job['_id'], user_id, prompt, input_hash)
+    return job
+
+
+def _run_job(job_id, user_id, prompt, input_hash):
+    db.analysis_jobs.update_one({'_id': job_id}, {'$set': {'status': 'running'}})
+    try:
+        analysis = run_analysis(user_id, prompt, input_hash)
+        update = {'status': 'done', 'analysis': analysis}
+    except Exception as e:
+        logger.exception('Analysis job %s failed', job_id)
+        update = {'status': 'failed', 'error': str(e)}
+    update['finishedAt'] = datetime.now()
+    db.analysis_jobs.update_one({'_id': job_id}, {'$set': update})
+
+
+def get_job(user_id, job_id):
+    return db.analysis_jobs.find_one({'_id': ObjectId(job_id), 'userId': user_id})
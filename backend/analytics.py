@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from operator import itemgetter
+import numpy as np
+from database import get_database
+from models.rollup import bucket_start, next_bucket
+
+db = get_database()
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class TransactionFrame:
+    """A user's transactions held as parallel NumPy columns sorted by date.
+
+    ``dates`` is datetime64[ms], ``amounts`` float64 and ``categories`` an
+    integer code into ``category_names``. Because rows are date-ordered, any
+    time window is a contiguous slice found with a binary search, and all
+    window and category figures are sums and bincounts over those slices.
+    """
+
+    def __init__(self, dates, amounts, categories, category_names):
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.amounts = amounts[order]
+        self.categories = categories[order]
+        self.category_names = category_names
+        # Whole units per transaction, the int() truncation the dashboard has always used
+        self.units = np.trunc(self.amounts)
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Rows carry the date as epoch milliseconds in 't', which converts to
+        # datetime64 far faster than Python datetime objects do
+        rows = list(rows)
+        count = len(rows)
+        categories = [row.get('category') for row in rows]
+        lookup = {category: code for code, category in enumerate(dict.fromkeys(categories))}
+
+        return cls(np.fromiter(map(itemgetter('t'), rows), np.int64, count).view('datetime64[ms]'),
+                   np.fromiter(map(itemgetter('amount'), rows), np.float64, count),
+                   np.fromiter(map(lookup.__getitem__, categories), np.intp, count),
+                   [str(category) for category in lookup])
+
+    @classmethod
+    def from_documents(cls, documents):
+        one_ms = timedelta(milliseconds=1)
+        return cls.from_rows({**document, 't': (document['date'] - EPOCH) // one_ms}
+                             for document in documents)
+
+    @staticmethod
+    def pipeline(user_id, start, end, end_inclusive=True):
+        # The server hands dates back as epoch milliseconds, already in the
+        # order the (userId, date) index yields them
+        return [
+            {'$match': {'userId': user_id,
+                        'date': {'$gte': start, '$lte' if end_inclusive else '$lt': end}}},
+            {'$sort': {'date': 1}},
+            {'$project': {'_id': 0, 'amount': 1, 'category': 1,
+                          't': {'$subtract': ['$date', EPOCH]}}}
+        ]
+
+    @classmethod
+    def load(cls, user_id, start, end, batch_size=5000):
+        # One projected query for the whole window, however many periods it spans
+        rows = db.transactions.aggregate(cls.pipeline(user_id, start, end),
+                                         batchSize=batch_size)
+        return cls.from_rows(rows)
+
+    def window(self, start, end, end_inclusive=True):
+        first = np.searchsorted(self.dates, np.datetime64(start, 'ms'), side='left')
+        last = np.searchsorted(self.dates, np.datetime64(end, 'ms'),
+                               side='right' if end_inclusive else 'left')
+        return slice(first, last)
+
+
+def summarize(frame, window):
+    units = frame.units[window]
+    categories = frame.categories[window]
+    is_expense = units <= 0
+    expenses = np.where(is_expense, -units, 0)
+    size = len(frame.category_names)
+    spending = np.bincount(categories, weights=expenses, minlength=size)
+    present = np.bincount(categories, weights=is_expense, minlength=size) > 0
+
+    return {
+        'income': int(units.sum(where=~is_expense)),
+        'expenses': int(expenses.sum()),
+        'spendingByCategory': {frame.category_names[i]: int(spending[i])
+                               for i in np.flatnonzero(present)},
+        'net': float(frame.amounts[window].sum()),
+        'count': len(units)
+    }
+
+
+def period_over_period(frame, previous_start, start, end):
+    current = summarize(frame, frame.window(start, end))
+    previous = summarize(frame, frame.window(previous_start, start, end_inclusive=False))
+    return current, previous
+
+
+def bucket_totals(user_id, granularity, start, end):
+    # Same per-bucket figures as SpendRollup.series, bucketed by the server
+    # with $dateTrunc (MongoDB 5.0+); weeks start on Monday like the rollups
+    unit = {'$trunc': '$amount'}
+    pipeline = [
+        {'$match': {'userId': user_id,
+                    'date': {'$gte': bucket_start(start, granularity), '$lte': end}}},
+        {'$group': {
+            '_id': {'$dateTrunc': {'date': '$date', 'unit': granularity,
+                                   'startOfWeek': 'monday'}},
+            'income': {'$sum': {'$cond': [{'$gt': [unit, 0]}, unit, 0]}},
+            'expenses': {'$sum': {'$cond': [{'$lte': [unit, 0]}, {'$abs': unit}, 0]}}
+        }}
+    ]
+    return {row['_id']: (row['income'], row['expenses'])
+            for row in db.transactions.aggregate(pipeline)}
+
+
+def dense_series(totals, granularity, start, end):
+    """Zero-fill ``{bucket: (income, expenses)}`` into parallel lists.
+
+    Every bucket between ``start`` and ``end`` appears once, in order, so a
+    chart can plot the lists directly.
+    """
+    series = {'dates': [], 'income': [], 'expense': [], 'net': []}
+    bucket = bucket_start(start, granularity)
+    while bucket <= end:
+        income, expenses = totals.get(bucket, (0, 0))
+        series['dates'].append(bucket.strftime('%Y-%m-%d'))
+        series['income'].append(income)
+        series['expense'].append(expenses)
+        series['net'].append(income - expenses)
+        bucket = next_bucket(bucket, granularity)
+    return series
+
+
+DAYS_PER_MONTH = 30.4375
+
+
+def savings_rate(monthly_net):
+    # Recency-weighted mean of the monthly net; recent months count most
+    net = np.asarray(monthly_net, dtype=np.float64)
+    if not len(net):
+        return 0.0
+    return float(np.average(net, weights=np.arange(1, len(net) + 1)))
+
+
+def forecast_goals(targets, current, deadlines, monthly_net, now):
+    """Project when each goal is reached at the user's savings rate.
+
+    ``targets`` and ``current`` are amounts per goal and ``deadlines`` their
+    dates. All goals are computed at once as arrays. Each goal is projected
+    as if the whole savings rate went to it. Returns per-goal ``projected``
+    dates (None when the rate is not positive), ``onTrack`` flags and the
+    ``requiredMonthly`` saving needed to meet each deadline, plus the rate.
+    """
+    rate = savings_rate(monthly_net)
+    targets = np.asarray(targets, dtype=np.float64)
+    remaining = np.maximum(targets - np.asarray(current, dtype=np.float64), 0)
+    today = np.datetime64(now, 'D')
+    months_left = (np.asarray(deadlines, dtype='datetime64[D]') - today).astype(np.float64) \
+        / DAYS_PER_MONTH
+
+    if rate > 0:
+        days_needed = np.ceil(remaining / rate * DAYS_PER_MONTH).astype(np.int64)
+        projected = today + days_needed.astype('timedelta64[D]')
+        on_track = projected <= np.asarray(deadlines, dtype='datetime64[D]')
+        projected = projected.astype(str).tolist()
+    else:
+        projected = [None if left else str(today) for left in remaining]
+        on_track = remaining == 0
+
+    required = np.where(months_left > 0, remaining / np.maximum(months_left, 1e-9), remaining)
+    return {
+        'savingsRate': round(rate, 2),
+        'projected': projected,
+        'onTrack': on_track.tolist(),
+        'requiredMonthly': np.round(required, 2).tolist()
+    }
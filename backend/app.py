@@ -1,64 +1,151 @@
-from openai import OpenAI
-from flask import Flask, request, jsonify, send_file
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
 from flask_cors import CORS  # Import CORS correctly
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
+from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt, get_jwt_identity
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timedelta
-from database import get_database
+from config import Config
+from database import get_database, get_pool_stats
+from indexes import ensure_indexes, check_query_plans
+from analysis import (build_prompt, get_cached, get_job, load_window, prompt_hash,
+                      run_analysis, submit_job)
+from bulk_import import (IMPORT_FORMATS, ImportValidationError, import_transactions,
+                         insert_batch, normalize_records, normalize_table,
+                         normalize_transaction, read_table)
+from cache import make_cache
+from exports import (COLUMNAR_FORMATS, EXPORT_FIELDS, ColumnarUnavailable, gzip_chunks,
+                     iter_columnar, iter_csv, require_pyarrow)
+from metrics import init_app as init_metrics, registry as metrics_registry
+from pagination import DEFAULT_PAGE_SIZE, paginate, parse_limit
+from passwords import HashingBusy
+from models.budgets import Budget
+from models.goals import Goal
+from models.ledger import BalanceLedger
+from models.notification import Notification
+from models.rollup import SpendRollup
 from models.user import User
+import hmac
+import logging
 import os
-import csv
-import io
+import click
+from functools import wraps
 
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
-# Configuration
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Every route lives on this blueprint; create_app() builds the application.
+# Modules that pull in numpy (analytics, insights) are imported inside the
+# routes that use them, so a cold start only pays for what it serves.
+api = Blueprint('api', __name__, cli_group=None)
+logger = logging.getLogger(__name__)
 MONGO_URI = os.getenv('MONGO_URI')
 
 # Initialize extensions
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
+jwt = JWTManager()
 
 db = get_database()
+dashboard_cache = make_cache('dashboard')
+# Settings and profile, invalidated by the routes that write them
+profile_cache = make_cache('profile')
 
-
-def serialize_object_id(obj):
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    raise TypeError(
-        f"Object of type {obj.__class__.__name__} is not JSON serializable")
+# Settings copied into token claims when JWT_SETTINGS_CLAIMS is on
+SETTINGS_CLAIMS = {'currency': 'defaultCurrency', 'language': 'language'}
+PROFILE_EXCLUDED_FIELDS = {'password_hash': 0, 'totalBalance': 0, 'dataVersion': 0}
 
 
-@app.route('/', methods=['GET'])
+@api.route('/', methods=['GET'])
 def check():
     return "hello world"
 
 
+def internal_only(view):
+    # Operational endpoints: hidden unless INTERNAL_TOKEN is configured,
+    # then only for callers presenting it (Prometheus: `authorization`)
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.INTERNAL_TOKEN:
+            return jsonify({'error': 'Not found'}), 404
+        expected = f'Bearer {Config.INTERNAL_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# Connection pool statistics for this worker process
+@api.route('/internal/pool-stats', methods=['GET'])
+@internal_only
+def pool_stats():
+    return jsonify(get_pool_stats()), 200
+
+
+# Response cache hit/miss counters for this worker process
+@api.route('/internal/cache-stats', methods=['GET'])
+@internal_only
+def cache_stats():
+    return jsonify({cache.name: cache.stats()
+                    for cache in (dashboard_cache, profile_cache)}), 200
+
+
+# Prometheus-style request and Mongo metrics for this worker process
+@api.route('/internal/metrics', methods=['GET'])
+@internal_only
+def prometheus_metrics():
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def cacheable(document):
+    # Round-trip through the app's JSON provider so cached and fresh
+    # responses serialize identically, and any backend can store the value
+    return current_app.json.loads(current_app.json.dumps(document))
+
+
+def load_settings(user_id):
+    # Read-through; update_settings deletes the entry. That delete only
+    # reaches every worker on a shared backend, so with the per-process
+    # memory cache settings are read from Mongo to keep read-your-writes.
+    if not profile_cache.shared:
+        return db.settings.find_one({'userId': user_id})
+    key = profile_cache.key('settings', user_id)
+    user_settings = profile_cache.get(key)
+    if user_settings is None:
+        user_settings = db.settings.find_one({'userId': user_id})
+        if user_settings is None:
+            return None
+        user_settings = cacheable(user_settings)
+        profile_cache.set(key, user_settings)
+    return user_settings
+
+
+def settings_claims(user_id):
+    if not Config.JWT_SETTINGS_CLAIMS:
+        return {}
+    user_settings = load_settings(user_id) or {}
+    return {claim: user_settings.get(field) for claim, field in SETTINGS_CLAIMS.items()}
+
+
 # Get user profile
-@app.route('/api/profile', methods=['GET'])
+@api.route('/api/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     current_user_id = get_jwt_identity()
-    user = db.users.find_one({'_id': ObjectId(current_user_id)})
-    if user:
-        user['_id'] = str(user['_id'])
-        del user['password']
-        return jsonify(user), 200
-    return jsonify({'message': 'User not found'}), 404
+    # The balance changes with every transaction and is served by the
+    # dashboard, so the profile holds only fields that rarely change
+    key = profile_cache.key('profile', current_user_id)
+    user = profile_cache.get(key)
+    if user is None:
+        user = db.users.find_one({'email': current_user_id}, PROFILE_EXCLUDED_FIELDS)
+        if not user:
+            return jsonify({'message': 'User not found'}), 404
+        user = cacheable(user)
+        profile_cache.set(key, user)
+    return jsonify(user), 200
 
 
 # User Register
-@app.route('/auth/register', methods=['POST'])
+@api.route('/auth/register', methods=['POST'])
 def new_register():
     data = request.get_json()
     name = data.get('name')
@@ -68,62 +155,149 @@ def new_register():
     if User.get_user_by_email(email):
         return jsonify({"msg": "Email already exists"}), 400
 
-    user = User.create_user(name, email, password)
+    try:
+        user = User.create_user(name, email, password)
+    except HashingBusy as e:
+        return jsonify({"msg": str(e)}), 503, {'Retry-After': '1'}
     return jsonify({"msg": "User created successfully"}), 201
 
 
 # User Login
-@app.route('/auth/login', methods=['POST'])
+@api.route('/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
 
     user = User.get_user_by_email(email)
-    if user and user.check_password(password):
+    try:
+        valid = user is not None and user.check_password(password)
+    except HashingBusy as e:
+        return jsonify({"msg": str(e)}), 503, {'Retry-After': '1'}
+    if valid:
         # Create an access token with both name and email as claims
-        additional_claims = {"name": user.name, "email": email}
+        additional_claims = {"name": user.name, "email": email, **settings_claims(email)}
         access_token = create_access_token(
             identity=email, additional_claims=additional_claims)
         return jsonify(access_token=access_token), 200
     return jsonify({"msg": "Invalid Email or password"}), 401
 
 
-@app.route('/api/transactions', methods=['POST'])
+# Keyset order and projection for transaction listings; the sort is served
+# by the (userId, date, createdAt, _id) index
+TRANSACTION_SORT_KEYS = ['date', 'createdAt', '_id']
+TRANSACTION_FIELDS = ['userId', 'description', 'amount', 'category', 'date',
+                      'type', 'tags', 'createdAt']
+
+
+def format_transactions(transactions):
+    # Ids and dates are serialized by the app's JSON provider
+    for transaction in transactions:
+        transaction['time'] = transaction['createdAt']
+        transaction['accountId'] = ""
+    return transactions
+
+
+def build_transaction(user_id, data):
+    return normalize_transaction(user_id, data)
+
+
+@api.route('/api/transactions', methods=['POST'])
 @jwt_required()
 def create_transaction():
     current_user_id = get_jwt_identity()
     transactions = db.transactions
-    users = db.users
-
-    amount = float(request.json.get('amount'))
-    cate = request.json.get('category')
 
-    if not cate == 'income':
-        amount = -abs(amount)
-
-    new_transaction = {
-        'userId': current_user_id,
-        'description': request.json.get('description'),
-        'amount': amount,
-        'category': cate,
-        'date': datetime.strptime(request.json.get('date'), '%Y-%m-%d'),
-        'type': 'income' if cate == 'income' else 'expanse',  # 'income' or 'expense'
-        'createdAt': datetime.now()
-    }
+    new_transaction = build_transaction(current_user_id, request.json)
+    amount = new_transaction['amount']
 
     result = transactions.insert_one(new_transaction)
+    SpendRollup.record(new_transaction)
+    Goal.record(current_user_id, [new_transaction])
     new_transaction['_id'] = str(result.inserted_id)
 
     # Update user's total balance
-    users.update_one(
-        {'email': current_user_id},
-        {'$inc': {'totalBalance': amount}})
+    User.apply_balance_delta(current_user_id, amount, 'create', result.inserted_id)
+    Notification.evaluate_budgets(current_user_id, [new_transaction['category']])
 
     return jsonify(new_transaction), 201
 
 
-@app.route('/api/transactions', methods=['GET'])
+# Create many transactions at once, e.g. when a client syncs after being offline
+@api.route('/api/transactions/batch', methods=['POST'])
+@jwt_required()
+def create_transactions_batch():
+    current_user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('transactions')
+
+    try:
+        documents = normalize_records(current_user_id, data,
+                                      max_rows=Config.BATCH_MAX_TRANSACTIONS)
+    except ImportValidationError as e:
+        return jsonify({'error': str(e), 'rows': e.rows}), 400
+
+    created = insert_batch(current_user_id, documents,
+                           use_transaction=Config.BATCH_USE_TRANSACTION)
+    Notification.evaluate_budgets(
+        current_user_id, {document['category'] for document in documents})
+    return jsonify({'created': created,
+                    'ids': [document['_id'] for document in documents]}), 201
+
+
+# Edit transaction
+@api.route('/api/transactions/<transaction_id>', methods=['PUT'])
+@jwt_required()
+def update_transaction(transaction_id):
+    current_user_id = get_jwt_identity()
+    transactions = db.transactions
+
+    existing = transactions.find_one(
+        {'_id': ObjectId(transaction_id), 'userId': current_user_id})
+    if not existing:
+        return jsonify({'error': 'Transaction not found or you do not have permission to update it'}), 404
+
+    updated_transaction = build_transaction(
+        current_user_id, {**existing, 'date': existing['date'].strftime('%Y-%m-%d'), **request.json})
+    updated_transaction['createdAt'] = existing['createdAt']
+
+    transactions.update_one({'_id': existing['_id']},
+                            {'$set': updated_transaction})
+    SpendRollup.record(existing, sign=-1)
+    SpendRollup.record(updated_transaction)
+    Goal.record(current_user_id, [existing], sign=-1)
+    Goal.record(current_user_id, [updated_transaction])
+
+    User.apply_balance_delta(
+        current_user_id, updated_transaction['amount'] - existing['amount'], 'update',
+        existing['_id'])
+    Notification.evaluate_budgets(
+        current_user_id, {existing['category'], updated_transaction['category']})
+
+    updated_transaction['_id'] = transaction_id
+    return jsonify(updated_transaction), 200
+
+
+# Delete transaction
+@api.route('/api/transactions/<transaction_id>', methods=['DELETE'])
+@jwt_required()
+def delete_transaction(transaction_id):
+    current_user_id = get_jwt_identity()
+
+    deleted = db.transactions.find_one_and_delete(
+        {'_id': ObjectId(transaction_id), 'userId': current_user_id})
+    if not deleted:
+        return jsonify({'error': 'Transaction not found or you do not have permission to delete it'}), 404
+
+    SpendRollup.record(deleted, sign=-1)
+    Goal.record(current_user_id, [deleted], sign=-1)
+    User.apply_balance_delta(current_user_id, -deleted['amount'], 'delete', deleted['_id'])
+
+    return jsonify({'message': 'Transaction deleted successfully'}), 200
+
+
+@api.route('/api/transactions', methods=['GET'])
 @jwt_required()
 def get_transactions():
     current_user_id = get_jwt_identity()
@@ -133,31 +307,31 @@ def get_transactions():
     query = {'userId': current_user_id}
     if start_date and end_date:
         query['date'] = {
-            '$gte': datetime.strptime(start_date, '%Y -%m-%d'),
-            '$lte': datetime.strptime(end_date, '%Y - %m-%d')
+            '$gte': datetime.strptime(start_date, '%Y-%m-%d'),
+            '$lte': datetime.strptime(end_date, '%Y-%m-%d')
         }
 
-    transactions = list(db.transactions.find(query).sort('date', -1))
-    transactions = sorted(
-        transactions, key=lambda x: x['createdAt'], reverse=True)
-    transactions = sorted(
-        transactions, key=lambda x: x['date'], reverse=True)
+    # Newest first, one page at a time when ?limit or ?cursor is given; the
+    # next page is requested with the cursor returned in the X-Next-Cursor
+    # header. Without either the whole list is returned, as older clients expect.
+    cursor = request.args.get('cursor')
+    try:
+        limit = parse_limit(request.args.get('limit'),
+                            default=DEFAULT_PAGE_SIZE if cursor else None)
+        transactions, next_cursor = paginate(
+            db.transactions, query, TRANSACTION_SORT_KEYS, limit,
+            cursor=cursor, projection=TRANSACTION_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    for transaction in transactions:
-        transaction['_id'] = str(transaction['_id'])
-        transaction['userId'] = str(transaction['userId'])
-        transaction['date'] = transaction['date'].isoformat()
-        transaction['time'] = transaction['createdAt'].isoformat()
-    print('transactions: ', transactions)
-    return jsonify([
-        {**transaction, '_id': str(transaction['_id']), 'userId': str(
-            transaction['userId']), 'accountId': ""}
-        for transaction in transactions
-    ]), 200
+    response = jsonify(format_transactions(transactions))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 
 # Export Transaction for Specified Range
-@app.route('/api/transactions/export', methods=['GET'])
+@api.route('/api/transactions/export', methods=['GET'])
 @jwt_required()
 def export_transactions():
     current_user_id = get_jwt_identity()
@@ -171,31 +345,65 @@ def export_transactions():
             '$lte': datetime.strptime(end_date, '%Y-%m-%d')
         }
 
-    transactions = list(db.transactions.find(query).sort('date', -1))
+    export_format = request.args.get('format', 'csv')
+    if export_format != 'csv' and export_format not in COLUMNAR_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {export_format}'}), 400
 
-    output = io.StringIO()
-    writer = csv.writer(output)
+    # Stream rows straight from the cursor instead of building the file in memory
+    transactions = db.transactions.find(
+        query, EXPORT_FIELDS, batch_size=Config.EXPORT_BATCH_SIZE).sort('date', -1)
 
-    writer.writerow(['Date', 'Description', 'Category', 'Amount', 'Type'])
-    for transaction in transactions:
-        writer.writerow([
-            transaction['date'].strftime('%Y-%m-%d'),
-            transaction['description'],
-            transaction['category'],
-            abs(int(transaction['amount'])),
-            'Income' if int(transaction['amount']) > 0 else 'Expense'
-        ])
-
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name='transactions.csv'
-    )
+    if export_format == 'csv':
+        mimetype, filename = 'text/csv', 'transactions.csv'
+        body = iter_csv(transactions, rows_per_chunk=Config.EXPORT_BATCH_SIZE)
+    else:
+        try:
+            require_pyarrow()
+        except ColumnarUnavailable as e:
+            return jsonify({'error': str(e)}), 501
+        mimetype, filename = COLUMNAR_FORMATS[export_format]
+        body = iter_columnar(transactions, export_format,
+                             batch_size=Config.EXPORT_BATCH_SIZE)
 
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+    if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
 
-@app.route('/api/budgets', methods=['POST'])
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
+# Bulk import transactions from a parquet, arrow or csv file
+@api.route('/api/transactions/import', methods=['POST'])
+@jwt_required()
+def import_transactions_file():
+    current_user_id = get_jwt_identity()
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    import_format = request.args.get('format') or \
+        os.path.splitext(upload.filename or '')[1].lstrip('.').lower()
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'error': f'Unsupported import format: {import_format}'}), 400
+
+    try:
+        table = normalize_table(read_table(upload.stream, import_format),
+                                max_rows=Config.IMPORT_MAX_ROWS)
+    except ColumnarUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    except ImportValidationError as e:
+        return jsonify({'error': str(e), 'rows': e.rows}), 400
+
+    imported = import_transactions(current_user_id, table,
+                                   batch_size=Config.IMPORT_BATCH_SIZE)
+    Notification.evaluate_budgets(
+        current_user_id, table.column('category').unique().to_pylist())
+    return jsonify({'imported': imported}), 201
+
+
+@api.route('/api/budgets', methods=['POST'])
 @jwt_required()
 def create_budget():
     current_user_id = get_jwt_identity()
@@ -218,12 +426,13 @@ def create_budget():
 
     result = budgets.insert_one(new_budget)
     new_budget['_id'] = str(result.inserted_id)
+    Notification.evaluate_budgets(current_user_id, [new_budget['category']])
 
     return jsonify(new_budget), 201
 
 
 # Edit budget
-@app.route('/api/budgets/<budget_id>', methods=['PUT'])
+@api.route('/api/budgets/<budget_id>', methods=['PUT'])
 @jwt_required()
 def update_budget(budget_id):
     current_user_id = get_jwt_identity()
@@ -244,13 +453,15 @@ def update_budget(budget_id):
         return jsonify({'error': 'Budget not found or you do not have permission to update it'}), 404
 
     updated_budget = budgets.find_one({'_id': ObjectId(budget_id)})
-    updated_budget['_id'] = str(updated_budget['_id'])
+    if 'category' in updated_budget:
+        Notification.evaluate_budgets(
+            current_user_id, [updated_budget['category']])
 
     return jsonify(updated_budget), 200
 
 
 # Delete budget
-@app.route('/api/budgets/<budget_id>', methods=['DELETE'])
+@api.route('/api/budgets/<budget_id>', methods=['DELETE'])
 @jwt_required()
 def delete_budget(budget_id):
     current_user_id = get_jwt_identity()
@@ -266,78 +477,83 @@ def delete_budget(budget_id):
 
 
 # Modified get_budgets route
-@app.route('/api/budgets', methods=['GET'])
+@api.route('/api/budgets', methods=['GET'])
 @jwt_required()
 def get_budgets():
     current_user_id = get_jwt_identity()
     budgets = list(db.budgets.find({'userId': current_user_id}))
 
     for budget in budgets:
-        budget['_id'] = str(budget['_id'])
-        budget['userId'] = str(budget['userId'])
         budget['category'] = str(
             budget['category']) if 'category' in budget else str(budget['categoryId'])
 
-        # Calculate spent amount
-        start_of_period = get_start_of_period(budget['period'])
-        transactions = db.transactions.find({
-            'userId': current_user_id,
-            'category': budget['category'],
-            'date': {'$gte': start_of_period}
-        })
-        spent = sum(int(transaction['amount']) for transaction in transactions)
-        budget['spent'] = spent
+    # Calculate spent amount for every budget in a single query. Exceeded
+    # budgets are notified from the transaction write path, not here.
+    spent_by_budget = Budget.get_spend(current_user_id, budgets)
 
-        # Check if budget is exceeded
-        if spent > int(budget['amount']):
-            create_notification(
-                current_user_id, budget['category'], spent, budget['amount'])
+    for budget in budgets:
+        budget['spent'] = spent_by_budget.get(
+            (budget['category'], budget['period']), 0)
 
     return jsonify(budgets), 200
 
 
+# Keyset order of the notification feed, served by (userId, createdAt, _id)
+NOTIFICATION_SORT_KEYS = ['createdAt', '_id']
+
+
 # New route to get notifications
-@app.route('/api/notifications', methods=['GET'])
+@api.route('/api/notifications', methods=['GET'])
 @jwt_required()
 def get_notifications():
     current_user_id = get_jwt_identity()
-    notifications = list(db.notifications.find(
-        {'userId': current_user_id}).sort('createdAt', -1))
 
-    for notification in notifications:
-        notification['_id'] = str(notification['_id'])
-        notification['userId'] = str(notification['userId'])
+    # Newest first, one page at a time, like the transaction listing
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        notifications, next_cursor = paginate(
+            db.notifications, {'userId': current_user_id}, NOTIFICATION_SORT_KEYS,
+            limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    return jsonify(notifications), 200
+    response = jsonify(notifications)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 
-def create_notification(user_id, category, spent, limit):
-    notification = {
-        'userId': user_id,
-        'category': category,
-        'message': f"Budget limit exceeded for {category}. Spent: ${int(spent):.2f}, Limit: ${int(limit):.2f}",
-        'createdAt': datetime.now(),
-        'read': False
-    }
-    db.notifications.insert_one(notification)
-
-
-def get_start_of_period(period):
-    now = datetime.now()
-    if period == 'daily':
-        return now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elif period == 'weekly':
-        return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=now.weekday())
-    elif period == 'monthly':
-        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    elif period == 'yearly':
-        return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+# Number of unread notifications, read from a counter document
+@api.route('/api/notifications/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_notification_count():
+    current_user_id = get_jwt_identity()
+    return jsonify({'unread': Notification.unread_count(current_user_id)}), 200
+
+
+# Mark notifications read: {"ids": [...]} or {"all": true}
+@api.route('/api/notifications/read', methods=['POST'])
+@jwt_required()
+def mark_notifications_read():
+    current_user_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    if data.get('all'):
+        updated = Notification.mark_read(current_user_id)
+    elif isinstance(data.get('ids'), list):
+        try:
+            updated = Notification.mark_read(current_user_id, data['ids'])
+        except InvalidId:
+            return jsonify({'error': 'Invalid notification id'}), 400
     else:
-        return now  # Default to current time if period is not recognized
+        return jsonify({'error': 'Provide a list of ids or all: true'}), 400
+
+    return jsonify({'updated': updated,
+                    'unread': Notification.unread_count(current_user_id)}), 200
 
 
 # Create a new financial goal
-@app.route('/api/goals', methods=['POST'])
+@api.route('/api/goals', methods=['POST'])
 @jwt_required()
 def create_goal():
     current_user_id = get_jwt_identity()
@@ -349,40 +565,43 @@ def create_goal():
         'targetAmount': request.json.get('targetAmount'),
         'currentAmount': request.json.get('currentAmount', 0),
         'deadline': datetime.strptime(request.json.get('deadline'), '%Y-%m-%d'),
+        # Transactions in this category or with this tag count towards the goal
+        'category': request.json.get('category'),
+        'tag': request.json.get('tag'),
+        'startDate': datetime.now().replace(hour=0, minute=0, second=0, microsecond=0),
         'createdAt': datetime.now(),
         'updatedAt': datetime.now()
     }
+    new_goal['contributed'] = Goal.contributed_since(current_user_id, new_goal)
 
     result = goals.insert_one(new_goal)
+    Goal.invalidate(current_user_id)
     new_goal['_id'] = str(result.inserted_id)
 
     return jsonify(new_goal), 201
 
 
 # Get user's financial goals
-@app.route('/api/goals', methods=['GET'])
+@api.route('/api/goals', methods=['GET'])
 @jwt_required()
 def get_goals():
     current_user_id = get_jwt_identity()
-    goals = db.goals.find({'userId': current_user_id})
+    user = db.users.find_one({'email': current_user_id}, {'dataVersion': 1}) or {}
 
-    return jsonify([
-        {**goal, '_id': str(goal['_id']), 'userId': str(goal['userId'])}
-        for goal in goals
-    ]), 200
+    return jsonify(Goal.get_progress(current_user_id, user.get('dataVersion', 0))), 200
 
 
 # Update user settings
-@app.route('/api/settings', methods=['PUT'])
+@api.route('/api/settings', methods=['PUT'])
 @jwt_required()
 def update_settings():
     current_user_id = get_jwt_identity()
     settings = db.settings
 
-    user_settings = settings.find_one({'userId': ObjectId(current_user_id)})
+    user_settings = settings.find_one({'userId': current_user_id})
     if not user_settings:
         user_settings = {
-            'userId': ObjectId(current_user_id),
+            'userId': current_user_id,
             'createdAt': datetime.utcnow()
         }
 
@@ -399,31 +618,38 @@ def update_settings():
     else:
         result = settings.insert_one(user_settings)
         user_settings['_id'] = result.inserted_id
+    profile_cache.delete(profile_cache.key('settings', current_user_id))
 
-    user_settings['_id'] = str(user_settings['_id'])
-    user_settings['userId'] = str(user_settings['userId'])
+    # Claims in earlier tokens are now stale; hand the client a fresh one
+    if Config.JWT_SETTINGS_CLAIMS:
+        claims = get_jwt()
+        user_settings['access_token'] = create_access_token(
+            identity=current_user_id,
+            additional_claims={'name': claims.get('name'), 'email': claims.get('email'),
+                               **settings_claims(current_user_id)})
 
     return jsonify(user_settings), 200
 
 
 # Get user settings
-@app.route('/api/settings', methods=['GET'])
+@api.route('/api/settings', methods=['GET'])
 @jwt_required()
 def get_settings():
     current_user_id = get_jwt_identity()
-    user_settings = db.settings.find_one(
-        {'userId': ObjectId(current_user_id)})
+    user_settings = load_settings(current_user_id)
 
     if user_settings:
-        user_settings['_id'] = str(user_settings['_id'])
-        user_settings['userId'] = str(user_settings['userId'])
         return jsonify(user_settings), 200
 
     return jsonify({'message': 'Settings not found'}), 404
 
 
+TIME_RANGE_DAYS = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365}
+SERIES_GRANULARITIES = ('day', 'week', 'month')
+
+
 # Get dashboard data
-@app.route('/api/dashboard', methods=['GET'])
+@api.route('/api/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard_data():
     token = get_jwt_identity()
@@ -431,51 +657,82 @@ def get_dashboard_data():
 
     # Calculate date range
     end_date = datetime.now()
-    if time_range == 'week':
-        start_date = end_date - timedelta(days=7)
-    elif time_range == 'month':
-        start_date = end_date - timedelta(days=30)
-    elif time_range == 'quarter':
-        start_date = end_date - timedelta(days=90)
-    elif time_range == 'year':
-        start_date = end_date - timedelta(days=365)
-    else:
+    if time_range not in TIME_RANGE_DAYS:
         return jsonify({'message': 'Invalid time range'}), 400
-
-    # Get transactions within the date range
-    transactions = db.transactions.find({
-        'userId': token,
-        'date': {'$gte': start_date, '$lte': end_date}
-    })
-
-    # Calculate total balance, income, and expenses
-    total_balance = 0
-    income = 0
-    expenses = 0
-    spending_by_category = {}
-
-    for transaction in transactions:
-        amount = int(transaction['amount'])
-        if amount > 0:
-            income += amount
-        else:
-            expenses += abs(amount)
-            category = transaction['category']
-            spending_by_category[category] = spending_by_category.get(
-                category, 0) + abs(amount)
+    start_date = end_date - timedelta(days=TIME_RANGE_DAYS[time_range])
 
     # Get user's total balance
     user = db.users.find_one({'email': token})
-    print('user: ', user)
     total_balance = user.get('totalBalance', 0)
 
-    # Get previous period's balance for comparison
+    # Serve from cache until a transaction write bumps the user's dataVersion;
+    # the date is part of the key because the window rolls over at midnight
+    cache_key = dashboard_cache.key(
+        'dashboard', token, time_range, user.get('dataVersion', 0), end_date.date())
+    dashboard_data = dashboard_cache.get(cache_key)
+    if dashboard_data is not None:
+        return jsonify(dashboard_data), 200
+
+    # Calculate income, expenses and the previous period's balance
     previous_start_date = start_date - (end_date - start_date)
-    previous_transactions = db.transactions.find({
-        'userId': token,
-        'date': {'$gte': previous_start_date, '$lt': start_date}
-    })
-    previous_balance = sum(t['amount'] for t in previous_transactions)
+    if Config.SPEND_ROLLUPS:
+        summary = summarize_rollups(
+            token, previous_start_date, start_date, end_date)
+    else:
+        summary = summarize_transactions(
+            token, previous_start_date, start_date, end_date)
+
+    # Insights read the few months their rules need, whatever the time range;
+    # the full history is left to /api/analyze-transactions?source=local
+    recent = None
+    if Config.LOCAL_INSIGHTS:
+        from insights import history_start
+        recent = load_window(token, since=history_start(end_date))
+    dashboard_data = build_dashboard(total_balance, time_range, summary, recent, end_date)
+    dashboard_cache.set(cache_key, dashboard_data)
+
+    return jsonify(dashboard_data), 200
+
+
+# Income, expense and net per day, week or month, zero-filled for charts
+@api.route('/api/dashboard/series', methods=['GET'])
+@jwt_required()
+def get_dashboard_series():
+    token = get_jwt_identity()
+    time_range = request.args.get('timeRange', 'month')
+    granularity = request.args.get('granularity', 'day')
+    if time_range not in TIME_RANGE_DAYS:
+        return jsonify({'message': 'Invalid time range'}), 400
+    if granularity not in SERIES_GRANULARITIES:
+        return jsonify({'message': 'Invalid granularity'}), 400
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=TIME_RANGE_DAYS[time_range])
+
+    user = db.users.find_one({'email': token}, {'dataVersion': 1}) or {}
+    cache_key = dashboard_cache.key(
+        'series', token, time_range, granularity, user.get('dataVersion', 0), end_date.date())
+    series = dashboard_cache.get(cache_key)
+    if series is not None:
+        return jsonify(series), 200
+
+    from analytics import bucket_totals, dense_series
+    if Config.SPEND_ROLLUPS:
+        totals = SpendRollup.series(token, granularity, start_date, end_date)
+    else:
+        totals = bucket_totals(token, granularity, start_date, end_date)
+    series = {'granularity': granularity,
+              **dense_series(totals, granularity, start_date, end_date)}
+    dashboard_cache.set(cache_key, series)
+
+    return jsonify(series), 200
+
+
+def build_dashboard(total_balance, time_range, summary, recent, end_date):
+    # The dashboard payload from the period summary; ``recent`` transactions
+    # feed the local insights and are None when those are disabled
+    income, expenses, spending_by_category, previous_balance = summary
+
     balance_change = total_balance - previous_balance
 
     # Prepare income vs expenses data
@@ -507,6 +764,10 @@ def get_dashboard_data():
             'message': f'Your expenses (${expenses:.2f}) exceeded your income (${income:.2f}) in this {time_range}.'
         })
 
+    if recent is not None:
+        from insights import generate_insights
+        insights.extend(generate_insights(recent, end_date))
+
     dashboard_data = {
         'totalBalance': total_balance,
         'balanceChange': balance_change,
@@ -516,39 +777,153 @@ def get_dashboard_data():
         'spendingByCategory': spending_by_category,
         'insights': insights
     }
+    return dashboard_data
 
-    return jsonify(dashboard_data), 200
+
+def summarize_transactions(user_id, previous_start_date, start_date, end_date):
+    # Load both periods in one query and compute the figures column-wise
+    from analytics import TransactionFrame, period_over_period
+    frame = TransactionFrame.load(user_id, previous_start_date, end_date)
+    current, previous = period_over_period(
+        frame, previous_start_date, start_date, end_date)
+
+    return current['income'], current['expenses'], current['spendingByCategory'], previous['net']
+
+
+def summarize_rollups(user_id, previous_start_date, start_date, end_date):
+    # Same figures as summarize_transactions, read from daily rollup buckets.
+    # Transaction dates are stored at midnight, so day buckets line up exactly.
+    return fold_rollups(
+        SpendRollup.find_buckets(user_id, 'day', previous_start_date, end_date), start_date)
 
 
-@app.route('/api/analyze-transactions', methods=['GET'])
+def fold_rollups(buckets, start_date):
+    income = 0
+    expenses = 0
+    spending_by_category = {}
+    previous_balance = 0
+
+    for bucket in buckets:
+        if bucket['bucket'] < start_date:
+            previous_balance += bucket['total']
+            continue
+        income += bucket['income']
+        expenses += bucket['expenses']
+        if bucket['expenses']:
+            spending_by_category[bucket['category']] = spending_by_category.get(
+                bucket['category'], 0) + bucket['expenses']
+
+    return income, expenses, spending_by_category, previous_balance
+
+
+# Rebuild spend rollups from raw transactions
+@api.cli.command('rebuild-rollups')
+@click.option('--user', 'user_id', default=None, help='Only rebuild this user (email).')
+def rebuild_rollups(user_id):
+    count = SpendRollup.rebuild(user_id)
+    click.echo(f'Rebuilt {count} rollup buckets')
+
+
+# Fold the balance ledger into checkpoints and repair drifted totalBalance;
+# meant to run periodically, e.g. from cron
+@api.cli.command('reconcile-balances')
+@click.option('--user', 'user_id', default=None, help='Only reconcile this user (email).')
+def reconcile_balances(user_id):
+    corrected = BalanceLedger.reconcile(user_id, settle_seconds=Config.LEDGER_SETTLE_SECONDS,
+                                        lookback_hours=Config.LEDGER_LOOKBACK_HOURS)
+    for user, drift in corrected.items():
+        click.echo(f'{user}: corrected totalBalance by {drift}')
+    click.echo(f'Reconciled balances, {len(corrected)} corrected')
+
+
+# Create indexes and fail if any route query still plans a COLLSCAN
+@api.cli.command('check-indexes')
+def check_indexes():
+    ensure_indexes(db)
+    failures = check_query_plans(db)
+    for route in failures:
+        click.echo(f'COLLSCAN: {route}')
+    if failures:
+        raise SystemExit(1)
+    click.echo('All route queries use an index')
+
+
+@api.route('/api/analyze-transactions', methods=['GET'])
 @jwt_required()
 def analyze_transactions():
+    from insights import generate_insights
     current_user_id = get_jwt_identity()
-    transactions = list(db.transactions.find(
-        {'userId': current_user_id}).sort('date', -1).limit(50))
+    transactions = load_window(current_user_id)
+
+    # ?source=local skips the LLM, ?source=both adds the local insights to it
+    source = request.args.get('source', 'llm')
+    if source not in ('llm', 'local', 'both'):
+        return jsonify({'error': 'source must be llm, local or both'}), 400
+    result = {}
+    if source != 'llm':
+        result['insights'] = generate_insights(transactions)
+        if source == 'local':
+            return jsonify(result), 200
+
+    prompt = build_prompt(transactions)
+    input_hash = prompt_hash(prompt)
+
+    # Same transaction window as last time: reuse the stored analysis
+    analysis = get_cached(current_user_id, input_hash)
+    if analysis is not None:
+        return jsonify({**result, "analysis": analysis, "cached": True}), 200
+
+    # ?async=true queues the completion and returns a job to poll
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        job = submit_job(current_user_id, prompt, input_hash)
+        return jsonify({**result, "jobId": job['_id'], "status": job['status']}), 202
 
-    transaction_text = "\n".join([
-        f"Date: {t['date'].strftime('%Y-%m-%d')}, Description: {t['description']}, "
-        f"Category: {t['category']}, Amount: ${abs(int(t['amount'])):.2f}, "
-        f"Type: {'Income' if int(t['amount']) > 0 else 'Expense'}"
-        for t in transactions
-    ])
+    try:
+        analysis = run_analysis(current_user_id, prompt, input_hash)
+        return jsonify({**result, "analysis": analysis}), 200
+    except Exception as e:
+        # The LLM is unreachable: answer with the local insights instead
+        logger.exception('Analysis failed for %s; serving local insights', current_user_id)
+        return jsonify({"insights": result.get('insights') or generate_insights(transactions),
+                        "fallback": True, "error": str(e)}), 200
 
-    prompt = f"Analyze the following transactions and provide useful insights, including identifying potentially useless transactions or suggesting alternatives:\n\n{transaction_text}"
 
+# Poll a queued analysis job
+@api.route('/api/analyze-transactions/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_job(job_id):
+    current_user_id = get_jwt_identity()
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        analysis = response.choices[0].message.content
-        return jsonify({"analysis": analysis}), 200
-    except Exception as e:
-        print('error: ', e)
-        return jsonify({"error": str(e)}), 500
+        job = get_job(current_user_id, job_id)
+    except InvalidId:
+        job = None
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    result = {'jobId': job_id, 'status': job['status']}
+    if job['status'] == 'done':
+        result['analysis'] = job['analysis']
+    elif job['status'] == 'failed':
+        result['error'] = job['error']
+    return jsonify(result), 200
+
+
+def create_app():
+    app = Flask(__name__)
+    CORS(app, expose_headers=['X-Next-Cursor'])
+    init_metrics(app)
+
+    # Configuration
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=1)
+
+    jwt.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+
+# Module-level instance for gunicorn (app:app), Vercel and `flask run`
+app = create_app()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+"""ASGI entry point: async routes for the I/O-bound reads, Flask for the rest.
+
+Serve with an ASGI server, for example:
+
+    hypercorn asgi:application --workers 4
+
+The dashboard, transaction list and analysis routes run natively on Quart
+and pymongo's asyncio client, so a worker keeps serving other requests
+while their queries are in flight, and the dashboard issues its current-
+and previous-period queries concurrently. Every other path is handed to
+the unchanged Flask app through a WSGI adapter, so both apps share the
+same routes, tokens, caches and response shapes.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+from urllib.parse import parse_qs
+
+from flask_jwt_extended import decode_token
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, g, jsonify, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+
+import app as flask_module
+from analysis import build_prompt, get_cached, prompt_hash, run_analysis, window_query
+from analytics import TransactionFrame, summarize
+from cache import LRUCacheBackend
+from config import Config
+from database import get_async_database
+from insights import generate_insights, history_start
+from metrics import init_quart as init_metrics
+from pagination import DEFAULT_PAGE_SIZE, paginate_async, parse_limit
+
+logger = logging.getLogger(__name__)
+
+
+def jwt_required(view):
+    # Tokens are checked by flask_jwt_extended against the Flask app's
+    # settings, so both apps accept and reject exactly the same tokens
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Bearer '):
+            return jsonify({'msg': 'Missing Authorization Header'}), 401
+        try:
+            with flask_module.app.app_context():
+                claims = decode_token(header[len('Bearer '):])
+        except Exception as e:
+            return jsonify({'msg': str(e)}), 401
+        g.identity = claims['sub']
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+def create_app():
+    quart_app = Quart(__name__)
+    # Same JSON encoding and request metrics as the Flask app
+    init_metrics(quart_app)
+
+    @quart_app.route('/api/transactions', methods=['GET'])
+    @jwt_required
+    async def get_transactions():
+        db = get_async_database()
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        query = {'userId': g.identity}
+        if start_date and end_date:
+            query['date'] = {
+                '$gte': datetime.strptime(start_date, '%Y-%m-%d'),
+                '$lte': datetime.strptime(end_date, '%Y-%m-%d')
+            }
+
+        # Paged only when ?limit or ?cursor is given, like the Flask route
+        cursor = request.args.get('cursor')
+        try:
+            limit = parse_limit(request.args.get('limit'),
+                                default=DEFAULT_PAGE_SIZE if cursor else None)
+            transactions, next_cursor = await paginate_async(
+                db.transactions, query, flask_module.TRANSACTION_SORT_KEYS, limit,
+                cursor=cursor, projection=flask_module.TRANSACTION_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        response = jsonify(flask_module.format_transactions(transactions))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response, 200
+
+    @quart_app.route('/api/dashboard', methods=['GET'])
+    @jwt_required
+    async def get_dashboard_data():
+        db = get_async_database()
+        token = g.identity
+        time_range = request.args.get('timeRange', 'month')
+
+        end_date = datetime.now()
+        if time_range not in flask_module.TIME_RANGE_DAYS:
+            return jsonify({'message': 'Invalid time range'}), 400
+        start_date = end_date - timedelta(days=flask_module.TIME_RANGE_DAYS[time_range])
+        previous_start_date = start_date - (end_date - start_date)
+
+        user = await db.users.find_one({'email': token})
+        cache_key = flask_module.dashboard_cache.key(
+            'dashboard', token, time_range, user.get('dataVersion', 0), end_date.date())
+        dashboard_data = await _cache(flask_module.dashboard_cache.get, cache_key)
+        if dashboard_data is not None:
+            return jsonify(dashboard_data), 200
+
+        # Both periods and the insights window are independent reads
+        if Config.SPEND_ROLLUPS:
+            periods = [
+                db.spend_rollups.find({'userId': token, 'granularity': 'day', 'bucket': bucket})
+                .to_list()
+                for bucket in ({'$gte': previous_start_date, '$lt': start_date},
+                               {'$gte': start_date, '$lte': end_date})]
+        else:
+            periods = [
+                db.transactions.aggregate(TransactionFrame.pipeline(token, start, end, inclusive))
+                for start, end, inclusive in ((previous_start_date, start_date, False),
+                                              (start_date, end_date, True))]
+            periods = [_to_list(cursor) for cursor in periods]
+        recent = (db.transactions.find(*window_query(token, since=history_start(end_date)))
+                  .sort('date', -1).to_list()
+                  if Config.LOCAL_INSIGHTS else _none())
+        previous, current, recent = await asyncio.gather(*periods, recent)
+
+        if Config.SPEND_ROLLUPS:
+            summary = flask_module.fold_rollups(previous + current, start_date)
+        else:
+            previous = TransactionFrame.from_rows(previous)
+            current = TransactionFrame.from_rows(current)
+            figures = summarize(current, current.window(start_date, end_date))
+            summary = (figures['income'], figures['expenses'], figures['spendingByCategory'],
+                       summarize(previous, previous.window(
+                           previous_start_date, start_date, end_inclusive=False))['net'])
+
+        dashboard_data = flask_module.build_dashboard(
+            user.get('totalBalance', 0), time_range, summary, recent, end_date)
+        await _cache(flask_module.dashboard_cache.set, cache_key, dashboard_data)
+        return jsonify(dashboard_data), 200
+
+    @quart_app.route('/api/analyze-transactions', methods=['GET'])
+    @jwt_required
+    async def analyze_transactions():
+        db = get_async_database()
+        source = request.args.get('source', 'llm')
+        if source not in ('llm', 'local', 'both'):
+            return jsonify({'error': 'source must be llm, local or both'}), 400
+
+        transactions = await db.transactions.find(
+            *window_query(g.identity)).sort('date', -1).to_list()
+        result = {}
+        if source != 'llm':
+            result['insights'] = generate_insights(transactions)
+            if source == 'local':
+                return jsonify(result), 200
+
+        prompt = build_prompt(transactions)
+        input_hash = prompt_hash(prompt)
+        analysis = await asyncio.to_thread(get_cached, g.identity, input_hash)
+        if analysis is not None:
+            return jsonify({**result, "analysis": analysis, "cached": True}), 200
+
+        # The completion blocks on the network; keep it off the event loop
+        try:
+            analysis = await asyncio.to_thread(run_analysis, g.identity, prompt, input_hash)
+            return jsonify({**result, "analysis": analysis}), 200
+        except Exception as e:
+            logger.exception('Analysis failed for %s; serving local insights', g.identity)
+            return jsonify({"insights": result.get('insights') or generate_insights(transactions),
+                            "fallback": True, "error": str(e)}), 200
+
+    return quart_app
+
+
+async def _cache(operation, *args):
+    # The file and redis backends do blocking I/O; keep it off the event loop.
+    # The in-process LRU is a dict lookup and runs inline.
+    if isinstance(flask_module.dashboard_cache.backend, LRUCacheBackend):
+        return operation(*args)
+    return await asyncio.to_thread(operation, *args)
+
+
+async def _to_list(cursor):
+    # aggregate() returns a coroutine resolving to the cursor
+    return await (await cursor).to_list()
+
+
+async def _none():
+    return None
+
+
+quart_app = create_app()
+flask_app = AsyncioWSGIMiddleware(flask_module.app)
+
+
+def _is_native(scope):
+    adapter = quart_app.url_map.bind('')
+    try:
+        adapter.match(scope['path'], method=scope['method'])
+    except (NotFound, MethodNotAllowed):
+        return False
+    # Queued analysis jobs are only implemented by the Flask app
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return query.get('async', [''])[0].lower() not in ('1', 'true', 'yes')
+
+
+async def application(scope, receive, send):
+    # Lifespan and the async routes go to Quart, everything else to Flask
+    if scope['type'] == 'http' and not _is_native(scope):
+        return await flask_app(scope, receive, send)
+    return await quart_app(scope, receive, send)
@@ -0,0 +1,94 @@
+"""Compare the per-document dashboard loop with the NumPy analytics engine.
+
+Run from the backend directory:
+
+    python -m benchmarks.analytics_bench [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from analytics import EPOCH, TransactionFrame, period_over_period
+
+CATEGORIES = ['food', 'rent', 'transport', 'shopping', 'utilities', 'fun', 'income']
+
+
+def synthetic_documents(count, end, days=730, seed=7):
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        amount = rng.uniform(100, 5000) if category == 'income' else -rng.uniform(1, 300)
+        documents.append({'date': end - timedelta(days=rng.randrange(days)),
+                          'amount': amount, 'category': category})
+    return documents
+
+
+def loop_summary(documents, previous_start, start, end):
+    # The dashboard computation as it was written before the engine
+    income = expenses = previous_balance = 0
+    spending_by_category = {}
+    for transaction in documents:
+        if start <= transaction['date'] <= end:
+            amount = int(transaction['amount'])
+            if amount > 0:
+                income += amount
+            else:
+                expenses += abs(amount)
+                category = transaction['category']
+                spending_by_category[category] = spending_by_category.get(
+                    category, 0) + abs(amount)
+        elif previous_start <= transaction['date'] < start:
+            previous_balance += transaction['amount']
+    return income, expenses, spending_by_category, previous_balance
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    end = datetime(2026, 1, 1)
+    start = end - timedelta(days=365)
+    previous_start = start - (end - start)
+
+    print(f"{'rows':>10} {'loop ms':>10} {'load ms':>10} {'engine ms':>10} "
+          f"{'compute':>8} {'total':>8}")
+    for size in args.sizes:
+        documents = synthetic_documents(size, end)
+        # What TransactionFrame.load receives from the server: date-sorted
+        # rows with epoch-ms dates
+        rows = [{'t': (d['date'] - EPOCH) // timedelta(milliseconds=1),
+                 'amount': d['amount'], 'category': d['category']}
+                for d in sorted(documents, key=lambda d: d['date'])]
+        frame = TransactionFrame.from_rows(rows)
+
+        loop = best_of(args.repeat, lambda: loop_summary(
+            documents, previous_start, start, end))
+        load = best_of(args.repeat, lambda: TransactionFrame.from_rows(rows))
+        engine = best_of(args.repeat, lambda: period_over_period(
+            frame, previous_start, start, end))
+
+        # Sanity check: both paths agree on the headline figures
+        current, _ = period_over_period(frame, previous_start, start, end)
+        income, expenses, _, _ = loop_summary(documents, previous_start, start, end)
+        assert (current['income'], current['expenses']) == (income, expenses)
+
+        print(f"{size:>10} {loop * 1000:>10.1f} {load * 1000:>10.1f} "
+              f"{engine * 1000:>10.1f} {loop / engine:>7.1f}x {loop / (load + engine):>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
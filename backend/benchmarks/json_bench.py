@@ -0,0 +1,83 @@
+"""Compare per-field conversion plus Flask's JSON with the Mongo JSON provider.
+
+Run from the backend directory:
+
+    python -m benchmarks.json_bench [--sizes 1000 10000 100000] [--repeat 5]
+
+Each size builds transaction documents shaped like GET /api/transactions
+returns them and times turning them into a response body: the old way
+(str()/isoformat() on every field, then Flask's default provider) and
+the new way (documents as they come, through MongoJSONProvider).
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from serialization import MongoJSONProvider
+
+
+def documents(count):
+    now = datetime.now()
+    return [{'_id': ObjectId(), 'userId': 'bench@example.com', 'description': f"Merchant {i % 97}",
+             'amount': -(i % 300) - 0.99, 'category': 'food', 'type': 'expanse', 'tags': ['x'],
+             'date': now - timedelta(days=i % 730), 'createdAt': now}
+            for i in range(count)]
+
+
+def legacy(app, docs):
+    # The conversion loop the routes used to run before jsonify
+    for transaction in docs:
+        transaction['_id'] = str(transaction['_id'])
+        transaction['userId'] = str(transaction['userId'])
+        transaction['date'] = transaction['date'].isoformat()
+        transaction['time'] = transaction['createdAt'].isoformat()
+        transaction['accountId'] = ""
+    return app.json.response(docs).get_data()
+
+
+def native(app, docs):
+    for transaction in docs:
+        transaction['time'] = transaction['createdAt']
+        transaction['accountId'] = ""
+    return app.json.response(docs).get_data()
+
+
+def best_of(function, app, count, repeat):
+    # Fresh documents each run: the legacy loop mutates them in place
+    timings = []
+    for _ in range(repeat):
+        docs = documents(count)
+        with app.app_context():
+            started = time.perf_counter()
+            function(app, docs)
+            timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    default_app = Flask(__name__)
+    default_app.json = DefaultJSONProvider(default_app)
+    mongo_app = Flask(__name__)
+    mongo_app.json = MongoJSONProvider(mongo_app)
+    backend = 'orjson' if serialization.orjson else 'stdlib fallback'
+
+    print(f"{'docs':>9} {'legacy ms':>11} {'provider ms':>12} {'docs/s':>12} {'speedup':>8}  ({backend})")
+    for size in args.sizes:
+        before = best_of(legacy, default_app, size, args.repeat)
+        after = best_of(native, mongo_app, size, args.repeat)
+        print(f"{size:>9} {before * 1000:>11.1f} {after * 1000:>12.1f} "
+              f"{size / after:>12,.0f} {before / after:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Latency and throughput of the hot routes against seeded transaction data.
+
+Run from the backend directory:
+
+    python -m benchmarks.routes_bench [--sizes 1000 100000 1000000]
+        [--requests 50] [--concurrency 1] [--mongo-uri mongodb://localhost:27017]
+        [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.25]
+
+Without --mongo-uri the app runs on mongomock, which keeps everything in
+memory; use a local mongod for the 1M size. Each size is seeded into a
+fresh database, every route is driven through the Flask test client, and
+p50/p95/p99 latency, throughput and the process's peak RSS are reported.
+With --baseline the run is compared to a stored run and exits with status 1
+when a route's p95 or throughput regressed by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+BENCH_USER = 'bench@example.com'
+BENCH_PASSWORD = 'bench-password'
+SEED_BATCH = 10_000
+
+
+def configure(mongo_uri):
+    # Must run before the app is imported: Config reads the environment once
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    os.environ.setdefault('LLM_CLIENT', 'stub')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret-key-with-enough-length')
+    os.environ['MONGO_DB_NAME'] = 'finance_tracker_bench'
+    if mongo_uri:
+        os.environ['MONGO_URI'] = mongo_uri
+    else:
+        import mongomock
+        os.environ['MONGO_URI'] = 'mongodb://localhost:27017'
+        mongomock.patch(servers=(('localhost', 27017),)).start()
+
+
+def seed(db, size):
+    from benchmarks.analytics_bench import synthetic_documents
+    from models.rollup import SpendRollup
+    from models.user import User
+
+    db.client.drop_database(db.name)
+    User.create_user('Bench', BENCH_USER, BENCH_PASSWORD)
+
+    now = datetime.now()
+    balance = 0.0
+    documents = synthetic_documents(size, now, days=730)
+    for offset in range(0, size, SEED_BATCH):
+        batch = [{'userId': BENCH_USER, 'description': f"Merchant {i % 97}",
+                  'type': 'income' if d['category'] == 'income' else 'expanse',
+                  'createdAt': now, **d}
+                 for i, d in enumerate(documents[offset:offset + SEED_BATCH], offset)]
+        db.transactions.insert_many(batch, ordered=False)
+        balance += sum(d['amount'] for d in batch)
+    db.users.update_one({'email': BENCH_USER}, {'$set': {'totalBalance': balance}})
+
+    SpendRollup.rebuild(BENCH_USER)
+    db.budgets.insert_many([
+        {'userId': BENCH_USER, 'category': category, 'amount': 500, 'period': period,
+         'createdAt': now, 'updatedAt': now}
+        for category, period in (('food', 'monthly'), ('fun', 'weekly'), ('rent', 'yearly'))
+    ])
+
+
+def routes(headers):
+    # name: (method, path, kwargs); dashboard runs with its cache cleared
+    return {
+        'GET /api/transactions': ('get', '/api/transactions?limit=100', {'headers': headers}),
+        'GET /api/dashboard': ('get', '/api/dashboard?timeRange=year', {'headers': headers}),
+        'GET /api/budgets': ('get', '/api/budgets', {'headers': headers}),
+        'GET /api/transactions/export': ('get', '/api/transactions/export', {'headers': headers}),
+        'POST /auth/login': ('post', '/auth/login',
+                             {'json': {'email': BENCH_USER, 'password': BENCH_PASSWORD}}),
+    }
+
+
+def drive(app_module, method, path, kwargs, requests, concurrency):
+    def one(_):
+        client = app_module.app.test_client()
+        app_module.dashboard_cache.backend.clear()
+        started = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        # Streamed responses are only produced while the body is read
+        body = response.get_data()
+        elapsed = time.perf_counter() - started
+        assert response.status_code < 400, (path, response.status_code, body[:200])
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(one, range(requests))))
+    wall = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {'p50': round(p50, 2), 'p95': round(p95, 2), 'p99': round(p99, 2),
+            'rps': round(requests / wall, 2)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, by_route in results.items():
+        for route, stats in by_route.items():
+            before = baseline.get(size, {}).get(route)
+            if not isinstance(before, dict):
+                continue
+            if stats['p95'] > before['p95'] * (1 + tolerance):
+                regressions.append(f"{size} {route}: p95 {before['p95']} -> {stats['p95']} ms")
+            if stats['rps'] < before['rps'] * (1 - tolerance):
+                regressions.append(f"{size} {route}: {before['rps']} -> {stats['rps']} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--mongo-uri', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    if args.save_baseline and not args.baseline:
+        parser.error('--save-baseline needs --baseline PATH to write to')
+
+    configure(args.mongo_uri)
+    import app as app_module
+    from flask_jwt_extended import create_access_token
+
+    with app_module.app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity=BENCH_USER)}"}
+
+    results = {}
+    print(f"{'rows':>9} {'route':<28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8} {'rss MB':>8}")
+    for size in args.sizes:
+        seed(app_module.db, size)
+        results[str(size)] = {}
+        for name, (method, path, kwargs) in routes(headers).items():
+            stats = drive(app_module, method, path, kwargs, args.requests, args.concurrency)
+            results[str(size)][name] = stats
+            print(f"{size:>9} {name:<28} {stats['p50']:>9.2f} {stats['p95']:>9.2f} "
+                  f"{stats['p99']:>9.2f} {stats['rps']:>8.1f} {peak_rss_mb():>8.1f}")
+        results[str(size)]['peakRssMb'] = peak_rss_mb()
+    app_module.db.client.drop_database(app_module.db.name)
+
+    # Latencies only compare between runs with the same settings
+    settings = {'requests': args.requests, 'concurrency': args.concurrency,
+                'store': 'mongod' if args.mongo_uri else 'mongomock'}
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['settings'] != settings:
+            print(f"WARNING baseline was recorded with {baseline['settings']}")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import math
+from functools import wraps
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from database import get_client, get_database
+from exports import require_pyarrow
+from models.goals import Goal
+from models.rollup import SpendRollup
+from models.user import User
+
+db = get_database()
+
+IMPORT_FORMATS = ('parquet', 'arrow', 'csv')
+REQUIRED_COLUMNS = ('date', 'category', 'amount')
+MAX_REPORTED_ROWS = 20
+
+
+class ImportValidationError(ValueError):
+    def __init__(self, message, rows=None):
+        super().__init__(message)
+        self.rows = rows or []
+
+
+def rejects_malformed_input(function):
+    # pyarrow raises on corrupt or mislabeled uploads and on columns that
+    # cannot be cast; that is bad input, so the client gets a 400
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        pa = require_pyarrow()
+        try:
+            return function(*args, **kwargs)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+            raise ImportValidationError(f"Could not read the uploaded file: {e}") from e
+    return wrapper
+
+
+@rejects_malformed_input
+def read_table(stream, fmt):
+    pa = require_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_table(stream)
+    if fmt == 'arrow':
+        return pa.ipc.open_stream(stream).read_all()
+    if fmt == 'csv':
+        import pyarrow.csv as pacsv
+        return pacsv.read_csv(stream)
+    raise ImportValidationError(f"Unsupported import format: {fmt}")
+
+
+@rejects_malformed_input
+def normalize_table(table, max_rows):
+    """Validate and normalize an uploaded table with whole-column operations.
+
+    Returns a table with ``date``, ``description``, ``category``, ``amount``
+    and ``type`` columns following the same sign and type conventions as
+    ``create_transaction``. Raises ImportValidationError listing the first
+    offending row numbers when any row is invalid.
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    columns = {name.lower(): table.column(name) for name in table.column_names}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportValidationError(f"Missing columns: {', '.join(missing)}")
+    if table.num_rows > max_rows:
+        raise ImportValidationError(
+            f"Too many rows: {table.num_rows} (max {max_rows})")
+
+    amount = columns['amount']
+    if pa.types.is_string(amount.type) or pa.types.is_large_string(amount.type):
+        numeric = pc.match_substring_regex(
+            pc.utf8_trim_whitespace(amount), r'^[-+]?\d+(\.\d+)?$')
+        amount = pc.cast(pc.if_else(numeric, pc.utf8_trim_whitespace(amount), None),
+                         pa.float64())
+    else:
+        amount = pc.cast(amount, pa.float64())
+
+    date = columns['date']
+    if pa.types.is_string(date.type) or pa.types.is_large_string(date.type):
+        date = pc.strptime(date, format='%Y-%m-%d', unit='ms', error_is_null=True)
+    date = pc.cast(date, pa.timestamp('ms'))
+
+    category = pc.cast(columns['category'], pa.string())
+    description = columns.get('description')
+    description = pc.cast(description, pa.string()) if description is not None \
+        else pa.nulls(table.num_rows, pa.string())
+
+    invalid = pc.or_kleene(
+        pc.or_kleene(pc.is_null(amount), pc.is_null(date)),
+        pc.or_kleene(pc.is_null(category), pc.equal(pc.utf8_length(category), 0)))
+    invalid = pc.fill_null(invalid, True)
+    if pc.any(invalid).as_py():
+        rows = pc.indices_nonzero(invalid)[:MAX_REPORTED_ROWS].to_pylist()
+        raise ImportValidationError('Invalid rows', rows=rows)
+
+    is_income = pc.equal(category, 'income')
+    return pa.table({
+        'date': date,
+        'description': description,
+        'category': category,
+        'amount': pc.if_else(is_income, amount, pc.negate(pc.abs(amount))),
+        'type': pc.if_else(is_income, 'income', 'expanse'),
+    })
+
+
+def import_transactions(user_id, table, batch_size=1000):
+    """Insert a normalized table for ``user_id`` in unordered batches.
+
+    Spend rollups are updated once per batch and ``users.totalBalance`` once
+    per import, only for the rows that were actually written.
+    """
+    created_at = datetime.now()
+    imported = 0
+    balance_delta = 0
+
+    for batch in table.to_batches(max_chunksize=batch_size):
+        documents = [
+            {'_id': ObjectId(), 'userId': user_id, **row, 'createdAt': created_at}
+            for row in batch.to_pylist()
+        ]
+        try:
+            db.transactions.insert_many(documents, ordered=False)
+            written = documents
+        except BulkWriteError as e:
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            written = [document for i, document in enumerate(documents)
+                       if i not in failed]
+
+        SpendRollup.record_many(written)
+        Goal.record(user_id, written)
+        imported += len(written)
+        balance_delta += sum(document['amount'] for document in written)
+
+    if imported:
+        User.apply_balance_delta(user_id, balance_delta, 'import')
+    return imported
+
+
+def normalize_transaction(user_id, data, created_at=None):
+    # Income keeps its sign; every other category is stored as a negative expense
+    amount = float(data.get('amount'))
+    cate = data.get('category')
+
+    if not cate == 'income':
+        amount = -abs(amount)
+
+    transaction = {
+        'userId': user_id,
+        'description': data.get('description'),
+        'amount': amount,
+        'category': cate,
+        'date': datetime.strptime(data.get('date'), '%Y-%m-%d'),
+        'type': 'income' if cate == 'income' else 'expanse',  # 'income' or 'expense'
+        'createdAt': created_at or datetime.now()
+    }
+    # Optional labels, e.g. to link a transaction to a savings goal
+    if data.get('tags'):
+        transaction['tags'] = [str(tag) for tag in data['tags']]
+    return transaction
+
+
+def normalize_records(user_id, records, max_rows):
+    """Validate and normalize a list of JSON transactions in one pass.
+
+    Raises ImportValidationError listing the first offending indexes, so a
+    batch is either accepted whole or rejected whole.
+    """
+    if not isinstance(records, list):
+        raise ImportValidationError('Expected a list of transactions')
+    if len(records) > max_rows:
+        raise ImportValidationError(
+            f"Too many transactions: {len(records)} (max {max_rows})")
+
+    created_at = datetime.now()
+    documents, invalid = [], []
+    for i, data in enumerate(records):
+        try:
+            document = normalize_transaction(user_id, data, created_at)
+            valid = math.isfinite(document['amount']) and \
+                isinstance(document['category'], str) and document['category'] != ''
+        except (AttributeError, TypeError, ValueError):
+            valid = False
+        if valid:
+            document['_id'] = ObjectId()
+            documents.append(document)
+        else:
+            invalid.append(i)
+
+    if invalid:
+        raise ImportValidationError('Invalid rows', rows=invalid[:MAX_REPORTED_ROWS])
+    return documents
+
+
+def _write_batch(user_id, documents, session=None):
+    db.transactions.insert_many(documents, session=session)
+    SpendRollup.record_many(documents, session=session)
+    Goal.record(user_id, documents, session=session)
+    User.apply_balance_delta(
+        user_id, sum(document['amount'] for document in documents), 'batch',
+        session=session)
+
+
+def insert_batch(user_id, documents, use_transaction=False):
+    """Write already normalized documents with one aggregated balance update.
+
+    With ``use_transaction`` the insert, rollups and balance commit or abort
+    together; this needs a replica set or sharded cluster.
+    """
+    if not documents:
+        return 0
+    if use_transaction:
+        with get_client().start_session() as session:
+            session.with_transaction(
+                lambda session: _write_batch(user_id, documents, session))
+    else:
+        _write_batch(user_id, documents)
+    return len(documents)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+
+class LRUCacheBackend:
+    """In-process LRU with per-entry expiry. Each worker keeps its own copy."""
+
+    # Deletes made by one worker are not seen by the others
+    shared = False
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileCacheBackend:
+    """Shared cache on a local directory, one JSON file per key.
+
+    Stands in for a shared cache server when several workers run on one host.
+    """
+
+    shared = True
+
+    def __init__(self, directory, ttl=300):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires'] < time.time():
+            return None
+        return entry['value']
+
+    def set(self, key, value):
+        # Write to a temp file and rename so readers never see half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'expires': time.time() + self.ttl, 'value': value}, f)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+
+class RedisCacheBackend:
+    """Shared cache on Redis (or anything speaking its protocol, e.g. fakeredis)."""
+
+    shared = True
+
+    def __init__(self, client, ttl=300, prefix='cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, ttl=300):
+        import redis
+        return cls(redis.Redis.from_url(url), ttl=ttl)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(value))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """Counts hits and misses in front of any of the backends above.
+
+    Keys either embed the per-user data version, so a write bumps the
+    version and old keys simply stop matching, or are deleted by the write
+    itself. The in-process LRU only sees deletes made by its own worker;
+    other workers catch up when the entry expires.
+    """
+
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        # Whether a delete reaches every worker, so entries that are
+        # invalidated by deletion stay correct across workers
+        return self.backend.shared
+
+    @staticmethod
+    def key(*parts):
+        return ':'.join(str(part) for part in parts)
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def make_cache(name):
+    if Config.CACHE_BACKEND == 'redis':
+        backend = RedisCacheBackend.from_url(Config.CACHE_URL, ttl=Config.CACHE_TTL)
+    elif Config.CACHE_BACKEND == 'file':
+        backend = FileCacheBackend(os.path.join(Config.CACHE_DIR, name), ttl=Config.CACHE_TTL)
+    else:
+        backend = LRUCacheBackend(Config.CACHE_MAX_ENTRIES, ttl=Config.CACHE_TTL)
+    return ResponseCache(name, backend)
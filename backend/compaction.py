@@ -0,0 +1,145 @@
+import re
+from collections import defaultdict
+
+# Sections are filled in this order until the token budget runs out
+SECTION_ORDER = ('totals', 'recurring', 'monthly', 'merchants', 'recent')
+RECURRING_MIN_MONTHS = 3
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding(model):
+    # tiktoken may be missing or have no cached encodings offline;
+    # counting then falls back to the character estimate
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text, model='gpt-3.5-turbo'):
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly four characters per token for English text and numbers
+    return max(1, (len(text) + 3) // 4)
+
+
+def normalize_description(description):
+    # "NETFLIX.COM 8291 03/14" and "Netflix.com 1102" are the same merchant
+    text = re.sub(r'[\d#*/\\.,:;_-]+', ' ', str(description or '').lower())
+    return re.sub(r'\s+', ' ', text).strip() or 'unknown'
+
+
+def _money(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def summarize_sections(transactions):
+    """Pre-aggregate transactions into prompt sections of short lines.
+
+    Returns a dict of section name to list of lines, most informative first
+    within each section. Recurring merchants are listed once in 'recurring'
+    and left out of 'merchants'.
+    """
+    income = expenses = 0.0
+    months = defaultdict(lambda: defaultdict(float))
+    merchants = defaultdict(lambda: {'total': 0.0, 'count': 0, 'months': set(),
+                                     'amounts': [], 'category': None, 'label': None})
+
+    for t in transactions:
+        amount = float(t['amount'])
+        month = t['date'].strftime('%Y-%m')
+        if amount > 0:
+            income += amount
+            continue
+        expenses += -amount
+        months[month][t['category']] += -amount
+
+        merchant = merchants[(normalize_description(t.get('description')), t['category'])]
+        merchant['total'] += -amount
+        merchant['count'] += 1
+        merchant['months'].add(month)
+        merchant['amounts'].append(-amount)
+        merchant['label'] = merchant['label'] or t.get('description') or 'unknown'
+        merchant['category'] = t['category']
+
+    first = min((t['date'] for t in transactions), default=None)
+    last = max((t['date'] for t in transactions), default=None)
+    totals = []
+    if first is not None:
+        totals.append(f"Period {first:%Y-%m-%d} to {last:%Y-%m-%d}, {len(transactions)} transactions. "
+                      f"Income {_money(income)}, expenses {_money(expenses)}, net {_money(income - expenses)}.")
+
+    recurring, others = [], []
+    for merchant in sorted(merchants.values(), key=lambda m: -m['total']):
+        if len(merchant['months']) >= RECURRING_MIN_MONTHS:
+            typical = sorted(merchant['amounts'])[len(merchant['amounts']) // 2]
+            recurring.append(f"{merchant['label']} ({merchant['category']}): ~{_money(typical)} "
+                             f"in {len(merchant['months'])} months, {_money(merchant['total'])} total")
+        else:
+            others.append(f"{merchant['label']} ({merchant['category']}): "
+                          f"{_money(merchant['total'])} over {merchant['count']}x")
+
+    monthly = [
+        f"{month}: " + ", ".join(f"{category} {_money(amount)}" for category, amount in
+                                 sorted(categories.items(), key=lambda item: -item[1]))
+        for month, categories in sorted(months.items(), reverse=True)
+    ]
+
+    recent = [
+        f"{t['date']:%Y-%m-%d} {t.get('description')} ({t['category']}) {_money(float(t['amount']))}"
+        for t in sorted(transactions, key=lambda t: t['date'], reverse=True)
+    ]
+
+    return {'totals': totals, 'recurring': recurring, 'monthly': monthly,
+            'merchants': others, 'recent': recent}
+
+
+SECTION_TITLES = {
+    'totals': 'Overview',
+    'recurring': 'Recurring charges',
+    'monthly': 'Spending by month and category',
+    'merchants': 'Other spending by merchant',
+    'recent': 'Most recent transactions',
+}
+
+
+def compact_prompt(header, transactions, token_budget, model='gpt-3.5-turbo'):
+    """Build a prompt from aggregated sections that fits in ``token_budget``.
+
+    Lines are added section by section in SECTION_ORDER and stop as soon as
+    the next line would exceed the budget, so the most aggregated facts
+    always make it in and raw rows only fill what is left.
+    """
+    sections = summarize_sections(transactions)
+    parts = [header]
+    used = count_tokens(header, model)
+
+    for name in SECTION_ORDER:
+        lines = sections[name]
+        if not lines:
+            continue
+        title = f"\n{SECTION_TITLES[name]}:"
+        cost = count_tokens(title, model)
+        if used + cost >= token_budget:
+            break
+        parts.append(title)
+        used += cost
+        for line in lines:
+            cost = count_tokens('\n' + line, model)
+            if used + cost > token_budget:
+                return '\n'.join(parts)
+            parts.append(line)
+            used += cost
+
+    return '\n'.join(parts)
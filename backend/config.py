@@ -1,9 +1,102 @@
 import os
+import tempfile
+
+from dotenv import load_dotenv
+
+# Load environment variables before the class body reads them
+load_dotenv()
+
+
+def env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
 
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key'
     MONGO_URI = os.environ.get(
         'MONGO_URI') or 'mongodb://localhost:27017/finance_tracker'
+    MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME') or 'finance_tracker'
+    # Connection pool of the single per-process MongoClient (see database.py)
+    MONGO_MAX_POOL_SIZE = env_int('MONGO_MAX_POOL_SIZE', 50)
+    MONGO_MIN_POOL_SIZE = env_int('MONGO_MIN_POOL_SIZE', 0)
+    MONGO_MAX_IDLE_TIME_MS = env_int('MONGO_MAX_IDLE_TIME_MS', None)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', None)
+    MONGO_CONNECT_TIMEOUT_MS = env_int('MONGO_CONNECT_TIMEOUT_MS', 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = env_int(
+        'MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)
+    MONGO_SOCKET_TIMEOUT_MS = env_int('MONGO_SOCKET_TIMEOUT_MS', None)
+    MONGO_READ_PREFERENCE = os.environ.get(
+        'MONGO_READ_PREFERENCE') or 'primary'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'your-jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
+    # Embed defaultCurrency and language from the user's settings as token
+    # claims at login, so pages can skip the settings lookup
+    JWT_SETTINGS_CLAIMS = env_flag('JWT_SETTINGS_CLAIMS', 'false')
+    # Requests slower than this (milliseconds) get a structured log line
+    SLOW_REQUEST_MS = env_int('SLOW_REQUEST_MS', 500)
+    # Bearer token for the /internal/* stats endpoints; they answer 404
+    # until it is set
+    INTERNAL_TOKEN = os.environ.get('INTERNAL_TOKEN')
+    # Password hashing: 'scrypt' (werkzeug's default), 'pbkdf2' or 'bcrypt'.
+    # Hashes made with another hasher or cost are upgraded at the next login.
+    PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER') or 'scrypt'
+    PASSWORD_SCRYPT_N = env_int('PASSWORD_SCRYPT_N', 32768)
+    PASSWORD_PBKDF2_ITERATIONS = env_int('PASSWORD_PBKDF2_ITERATIONS', 1000000)
+    PASSWORD_BCRYPT_ROUNDS = env_int('PASSWORD_BCRYPT_ROUNDS', 12)
+    # Hashes running at once per process, how many more may wait, and how
+    # long (seconds) a request waits before getting a 503
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 2)
+    PASSWORD_HASH_QUEUE = env_int('PASSWORD_HASH_QUEUE', 16)
+    PASSWORD_HASH_TIMEOUT = env_int('PASSWORD_HASH_TIMEOUT', 5)
+    # Serve budget and dashboard totals from the spend_rollups collection.
+    # Transaction writes keep the rollups current either way, but data from
+    # before they existed has none: run `flask --app app rebuild-rollups`
+    # once, then turn this on. Off by default so a fresh deploy never shows
+    # zeros for existing users.
+    SPEND_ROLLUPS = env_flag('SPEND_ROLLUPS', 'false')
+    # Create the indexes in indexes.py on first database access, and
+    # optionally refuse to start when a route query plan is a COLLSCAN.
+    ENSURE_INDEXES = env_flag('ENSURE_INDEXES', 'true')
+    CHECK_QUERY_PLANS = env_flag('CHECK_QUERY_PLANS', 'false')
+    # Cursor batch size and rows per streamed chunk for transaction exports
+    EXPORT_BATCH_SIZE = env_int('EXPORT_BATCH_SIZE', 1000)
+    # Bulk import limits; insert_many runs unordered in batches of this size
+    IMPORT_MAX_ROWS = env_int('IMPORT_MAX_ROWS', 100000)
+    IMPORT_BATCH_SIZE = env_int('IMPORT_BATCH_SIZE', 1000)
+    # JSON batch endpoint: most transactions per request, and whether to
+    # write each batch in a multi-document transaction (needs a replica set)
+    BATCH_MAX_TRANSACTIONS = env_int('BATCH_MAX_TRANSACTIONS', 500)
+    BATCH_USE_TRANSACTION = env_flag('BATCH_USE_TRANSACTION', 'false')
+    # Balance reconciler: ledger entries younger than this are left for the
+    # next run; users with ledger activity in the lookback are reconciled
+    LEDGER_SETTLE_SECONDS = env_int('LEDGER_SETTLE_SECONDS', 60)
+    LEDGER_LOOKBACK_HOURS = env_int('LEDGER_LOOKBACK_HOURS', 24)
+    # Response cache: 'memory' (per-process LRU), 'file' or 'redis' (shared)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_URL = os.environ.get('CACHE_URL') or 'redis://localhost:6379/0'
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(
+        tempfile.gettempdir(), 'finance_tracker_cache')
+    CACHE_MAX_ENTRIES = env_int('CACHE_MAX_ENTRIES', 1024)
+    CACHE_TTL = env_int('CACHE_TTL', 300)
+    # Days a read notification is kept before the TTL index removes it
+    NOTIFICATION_RETENTION_DAYS = env_int('NOTIFICATION_RETENTION_DAYS', 90)
+    # Transaction analysis: 'openai' or the offline 'stub' client
+    OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    LLM_CLIENT = os.environ.get('LLM_CLIENT') or 'openai'
+    LLM_MODEL = os.environ.get('LLM_MODEL') or 'gpt-3.5-turbo'
+    ANALYSIS_WORKERS = env_int('ANALYSIS_WORKERS', 4)
+    ANALYSIS_CACHE_DAYS = env_int('ANALYSIS_CACHE_DAYS', 30)
+    # A queued or running job older than this is taken to belong to a worker
+    # that died or was recycled; an identical request then starts a new one
+    ANALYSIS_JOB_STALE_SECONDS = env_int('ANALYSIS_JOB_STALE_SECONDS', 600)
+    # History summarized into the prompt and the prompt size it must fit in
+    ANALYSIS_HISTORY_DAYS = env_int('ANALYSIS_HISTORY_DAYS', 365)
+    ANALYSIS_TOKEN_BUDGET = env_int('ANALYSIS_TOKEN_BUDGET', 1500)
+    # Add the local rule-based insights to the dashboard, computed over the
+    # periods it compares
+    LOCAL_INSIGHTS = env_flag('LOCAL_INSIGHTS', 'true')
@@ -1,26 +1,193 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 from config import Config
-from dotenv import load_dotenv
+from indexes import ensure_indexes, verify_query_plans
+from metrics import command_metrics
 import os
+import threading
+import time
 
-# Load environment variables
-load_dotenv()
-MONGO_URI = os.getenv('MONGO_URI')
+_client = None
+_client_pid = None
+_async_client = None
+_client_lock = threading.Lock()
+_indexes_ensured = False
 
 
-def get_database():
-    # print('srv: ', Config.MONGO_URI)
-    # Create a connection using MongoClient. You can import MongoClient or use pymongo.MongoClient
-    client = MongoClient(MONGO_URI)
-    db = client["finance_tracker"]
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters for sizing gunicorn workers and threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_open = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'maxPoolSize': Config.MONGO_MAX_POOL_SIZE,
+                'connectionsOpen': self.connections_open,
+                'checkedOut': self.checked_out,
+                'maxCheckedOut': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkoutFailures': self.checkout_failures,
+                'waitTimeTotalMs': round(self.wait_time_total * 1000, 3),
+                'waitTimeMaxMs': round(self.wait_time_max * 1000, 3),
+                'waitTimeAvgMs': round(self.wait_time_total * 1000 / self.checkouts, 3)
+                if self.checkouts else 0.0
+            }
+
+    def _wait_time(self, event):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        if getattr(event, 'duration', None) is not None:
+            return event.duration
+        return time.perf_counter() - started if started else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._wait_time(event)
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_check_out_failed(self, event):
+        self._wait_time(event)
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_stats = PoolStats()
+
+
+def _client_options():
+    return dict(
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        readPreference=Config.MONGO_READ_PREFERENCE
+    )
+
+
+def get_client():
+    # One MongoClient per process, created on first use. A forked worker
+    # sees a different pid and builds its own client instead of sharing
+    # the parent's sockets.
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            pool_stats.reset()
+            _client = MongoClient(
+                Config.MONGO_URI, event_listeners=[pool_stats, command_metrics],
+                **_client_options())
+            _client_pid = os.getpid()
+    return _client
+
+
+def get_async_database():
+    # The ASGI app's database, on pymongo's asyncio client. It is bound to
+    # the event loop that first uses it, so it is created inside the server
+    # process and never shared with the sync client's threads.
+    global _async_client
+    if _async_client is None:
+        from pymongo import AsyncMongoClient
+        _async_client = AsyncMongoClient(
+            Config.MONGO_URI, event_listeners=[command_metrics], **_client_options())
+    return _async_client[Config.MONGO_DB_NAME]
+
+
+def reset_client():
+    # Drop this process's clients so the next access builds fresh ones
+    global _client, _client_pid, _async_client
+    _client = None
+    _client_pid = None
+    _async_client = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_client)
+
+
+def _resolve_database():
+    db = get_client()[Config.MONGO_DB_NAME]
+
+    # Make sure the hot queries have their indexes, once per process
+    global _indexes_ensured
+    if Config.ENSURE_INDEXES and not _indexes_ensured:
+        _indexes_ensured = True
+        ensure_indexes(db)
+        if Config.CHECK_QUERY_PLANS:
+            verify_query_plans(db)
     return db
 
 
-# # This is added so that many files can reuse the function get_database()
-# if __name__ == "__main__":
+class _Database:
+    # Stand-in for pymongo's Database that resolves against the current
+    # process's client, so module-level `db = get_database()` stays lazy
+    # and fork-safe.
+
+    def __getattr__(self, name):
+        return getattr(_resolve_database(), name)
+
+    def __getitem__(self, name):
+        return _resolve_database()[name]
+
+
+_database = _Database()
+
+
+def get_database():
+    return _database
+
 
-#     # Get the database
-#     db = get_database()
-#     collection = db['users']
-#     for item in collection.find():
-#         print('item: ', item)
+def get_pool_stats():
+    return pool_stats.snapshot()
@@ -0,0 +1,142 @@
+import csv
+import io
+import zlib
+
+EXPORT_COLUMNS = ['Date', 'Description', 'Category', 'Amount', 'Type']
+EXPORT_FIELDS = ['date', 'description', 'category', 'amount']
+
+
+def export_row(transaction):
+    return [
+        transaction['date'].strftime('%Y-%m-%d'),
+        transaction['description'],
+        transaction['category'],
+        abs(int(transaction['amount'])),
+        'Income' if int(transaction['amount']) > 0 else 'Expense'
+    ]
+
+
+def iter_csv(transactions, rows_per_chunk=1000):
+    # Yield the CSV a chunk of rows at a time, reusing one small buffer
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    pending = 0
+    for transaction in transactions:
+        writer.writerow(export_row(transaction))
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks, level=6):
+    # Stream-compress chunks into a single gzip member
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Columnar formats need pyarrow, which is an optional dependency
+COLUMNAR_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'transactions.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'transactions.arrow'),
+}
+
+
+class ColumnarUnavailable(RuntimeError):
+    pass
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ColumnarUnavailable(
+            'pyarrow is required for parquet and arrow formats') from e
+    return pyarrow
+
+
+def columnar_schema(pa):
+    return pa.schema([
+        ('date', pa.timestamp('ms')),
+        ('description', pa.string()),
+        ('category', pa.string()),
+        ('amount', pa.float64()),
+        ('type', pa.string()),
+    ])
+
+
+class _ChunkSink:
+    # Append-only file object for pyarrow writers whose bytes are handed out
+    # as they are produced; tell() keeps counting so file offsets stay right
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_columnar(transactions, fmt, batch_size=1000):
+    # Yield a parquet file or arrow IPC stream one record batch at a time
+    pa = require_pyarrow()
+    schema = columnar_schema(pa)
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+
+    def flush(columns):
+        writer.write_batch(pa.record_batch(
+            [pa.array(columns[field.name], type=field.type) for field in schema],
+            schema=schema))
+        for values in columns.values():
+            values.clear()
+        return sink.drain()
+
+    columns = {field.name: [] for field in schema}
+    for transaction in transactions:
+        columns['date'].append(transaction['date'])
+        columns['description'].append(transaction.get('description'))
+        columns['category'].append(transaction['category'])
+        columns['amount'].append(transaction['amount'])
+        columns['type'].append(
+            'Income' if int(transaction['amount']) > 0 else 'Expense')
+        if len(columns['date']) >= batch_size:
+            yield flush(columns)
+
+    if columns['date']:
+        yield flush(columns)
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,54 @@
+"""gunicorn settings for production: `gunicorn -c gunicorn.conf.py app:app`.
+
+Every setting can be overridden from the environment, so the same file
+serves a small container and a large host.
+"""
+import math
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Import the app once in the master and fork the workers from it: the
+# import cost is paid once, and unchanged pages are shared between workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+
+def available_cpus():
+    # CPUs this process may run on, capped by a cgroup v2 quota when the
+    # container has one; cpu_count() reports the whole host
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus or 1
+
+
+# Requests mostly wait on Mongo, so each worker runs a few threads and the
+# threads, not extra processes, absorb the waiting: one worker per CPU plus
+# one. Every worker has its own Mongo pool, so keep workers * threads within
+# the server's connection limit; /internal/pool-stats shows the actual waits.
+workers = int(os.environ.get('WEB_CONCURRENCY') or available_cpus() + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 2000)
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # MongoClient is not fork-safe: drop any client the master created while
+    # preloading so the worker opens its own pool on first use. database.py
+    # also does this from os.register_at_fork; this covers platforms without it.
+    from database import reset_client
+    reset_client()
@@ -0,0 +1,179 @@
+import logging
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing the hot queries in app.py, keyed by collection
+INDEXES = {
+    'transactions': [
+        IndexModel([('userId', ASCENDING), ('date', DESCENDING),
+                    ('createdAt', DESCENDING), ('_id', DESCENDING)],
+                   name='userId_date_createdAt_id'),
+    ],
+    'budgets': [
+        IndexModel([('userId', ASCENDING), ('category', ASCENDING)],
+                   name='userId_category'),
+    ],
+    'notifications': [
+        IndexModel([('userId', ASCENDING), ('createdAt', DESCENDING), ('_id', DESCENDING)],
+                   name='userId_createdAt_id'),
+        # Read notifications expire after the retention period; unread ones
+        # have no readAt and are kept
+        IndexModel([('readAt', ASCENDING)], name='readAt_ttl',
+                   expireAfterSeconds=Config.NOTIFICATION_RETENTION_DAYS * 86400),
+        # Idempotency key of budget alerts; older notifications have none
+        IndexModel([('key', ASCENDING)], name='key_unique', unique=True,
+                   partialFilterExpression={'key': {'$exists': True}}),
+    ],
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'spend_rollups': [
+        IndexModel([('userId', ASCENDING), ('granularity', ASCENDING),
+                    ('bucket', ASCENDING), ('category', ASCENDING)],
+                   name='userId_granularity_bucket_category', unique=True),
+    ],
+    'notification_counters': [
+        IndexModel([('userId', ASCENDING)], name='userId_unique', unique=True),
+    ],
+    'analysis_cache': [
+        IndexModel([('userId', ASCENDING), ('inputHash', ASCENDING)],
+                   name='userId_inputHash_unique', unique=True),
+        IndexModel([('createdAt', ASCENDING)], name='createdAt_ttl',
+                   expireAfterSeconds=Config.ANALYSIS_CACHE_DAYS * 86400),
+    ],
+    'analysis_jobs': [
+        IndexModel([('userId', ASCENDING), ('inputHash', ASCENDING), ('status', ASCENDING)],
+                   name='userId_inputHash_status'),
+        IndexModel([('createdAt', ASCENDING)], name='createdAt_ttl',
+                   expireAfterSeconds=86400),
+    ],
+    'balance_ledger': [
+        IndexModel([('userId', ASCENDING), ('_id', ASCENDING)], name='userId_id'),
+    ],
+    'balance': [
+        IndexModel([('email', ASCENDING)], name='email'),
+    ],
+    'goals': [
+        IndexModel([('userId', ASCENDING)], name='userId'),
+    ],
+    'settings': [
+        IndexModel([('userId', ASCENDING)], name='userId'),
+    ],
+}
+
+
+def query_shapes():
+    # One explain command per query shape the routes issue
+    user = 'index-check@example.com'
+    now = datetime.now()
+    return {
+        'GET /api/transactions': {
+            'find': 'transactions', 'filter': {'userId': user},
+            'sort': {'date': -1, 'createdAt': -1, '_id': -1}},
+        'GET /api/transactions?start_date&end_date': {
+            'find': 'transactions',
+            'filter': {'userId': user, 'date': {'$gte': now, '$lte': now}},
+            'sort': {'date': -1, 'createdAt': -1, '_id': -1}},
+        'GET /api/dashboard': {
+            'find': 'transactions',
+            'filter': {'userId': user, 'date': {'$gte': now, '$lte': now}}},
+        'GET /api/dashboard/series (rollups)': {
+            'find': 'spend_rollups',
+            'filter': {'userId': user, 'granularity': 'week', 'bucket': {'$gte': now, '$lte': now}}},
+        'GET /api/budgets': {
+            'find': 'budgets', 'filter': {'userId': user}},
+        'POST /api/budgets': {
+            'find': 'budgets', 'filter': {'userId': user, 'category': 'food'}},
+        'GET /api/budgets (spend)': {
+            'aggregate': 'transactions', 'cursor': {}, 'pipeline': [
+                {'$match': {'userId': user, 'category': {'$in': ['food']},
+                            'date': {'$gte': now}}},
+                {'$group': {'_id': '$category', 'spent': {'$sum': '$amount'}}}]},
+        'GET /api/budgets (rollups)': {
+            'find': 'spend_rollups',
+            'filter': {'userId': user, 'category': {'$in': ['food']},
+                       '$or': [{'granularity': 'month', 'bucket': now}]}},
+        'GET /api/dashboard (rollups)': {
+            'find': 'spend_rollups',
+            'filter': {'userId': user, 'granularity': 'day',
+                       'bucket': {'$gte': now, '$lte': now}}},
+        'GET /api/notifications': {
+            'find': 'notifications', 'filter': {'userId': user},
+            'sort': {'createdAt': -1, '_id': -1}},
+        'GET /api/notifications/unread-count': {
+            'find': 'notification_counters', 'filter': {'userId': user}},
+        'POST /auth/login': {
+            'find': 'users', 'filter': {'email': user}},
+    }
+
+
+INDEX_OPTIONS_CONFLICT = 85
+
+
+def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                try:
+                    db[collection].create_indexes([index])
+                except OperationFailure as e:
+                    if e.code != INDEX_OPTIONS_CONFLICT or \
+                            'expireAfterSeconds' not in index.document:
+                        raise
+                    # The retention setting changed; update the TTL in place
+                    db.command('collMod', collection, index={
+                        'name': index.document['name'],
+                        'expireAfterSeconds': index.document['expireAfterSeconds']})
+            except Exception as e:
+                # A duplicate email must not take the whole app down at import time
+                logger.error('could not create index %s on %s: %s',
+                             index.document['name'], collection, e)
+
+
+def find_collscans(explain):
+    # Collect every COLLSCAN stage under a winningPlan, ignoring rejected plans
+    found = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'winningPlan':
+                found.extend(_find_stages(value, 'COLLSCAN'))
+            elif key != 'rejectedPlans':
+                found.extend(find_collscans(value))
+    elif isinstance(explain, list):
+        for value in explain:
+            found.extend(find_collscans(value))
+    return found
+
+
+def _find_stages(plan, stage):
+    found = []
+    if isinstance(plan, dict):
+        if plan.get('stage') == stage:
+            found.append(plan)
+        for value in plan.values():
+            found.extend(_find_stages(value, stage))
+    elif isinstance(plan, list):
+        for value in plan:
+            found.extend(_find_stages(value, stage))
+    return found
+
+
+def check_query_plans(db):
+    # Returns the route query shapes whose winning plan scans a whole collection
+    failures = []
+    for route, command in query_shapes().items():
+        plan = db.command('explain', command, verbosity='queryPlanner')
+        if find_collscans(plan):
+            failures.append(route)
+    return failures
+
+
+def verify_query_plans(db):
+    failures = check_query_plans(db)
+    if failures:
+        raise RuntimeError(
+            'Collection scans in query plans for: ' + ', '.join(failures))
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from compaction import normalize_description
+
+# Categories treated as discretionary by the unnecessary-spend heuristic
+DISCRETIONARY_CATEGORIES = {'entertainment', 'shopping', 'dining', 'restaurants',
+                            'subscriptions', 'coffee', 'travel', 'other'}
+CADENCES = (('weekly', 6, 8), ('monthly', 26, 35), ('yearly', 350, 380))
+RECENT_DAYS = 30
+ANOMALY_Z = 3.0
+ANOMALY_MIN_HISTORY = 5
+SPIKE_RATIO = 1.5
+SPIKE_MIN_AMOUNT = 50
+SMALL_PURCHASE = 20
+SMALL_PURCHASE_MIN_COUNT = 8
+
+
+def history_start(now):
+    """Oldest date the rules look at: the start of the third month back.
+
+    Spikes compare this month with the three full months before it, and
+    anomalies and recurring charges need that much history too.
+    """
+    month = now.year * 12 + now.month - 1 - 3
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def _expenses(transactions):
+    # Expenses are stored as negative amounts; insights work on magnitudes.
+    # Transactions may be saved without a category.
+    return [{**t, 'category': str(t.get('category') or 'other')}
+            for t in transactions if float(t['amount']) < 0]
+
+
+def recurring_charges(transactions, now=None):
+    by_merchant = defaultdict(list)
+    for t in _expenses(transactions):
+        by_merchant[(normalize_description(t.get('description')), t['category'])].append(t)
+
+    insights = []
+    for (_, category), items in by_merchant.items():
+        if len(items) < 3:
+            continue
+        items.sort(key=lambda t: t['date'])
+        days = np.diff(np.array([t['date'] for t in items], dtype='datetime64[D]')).astype(int)
+        amounts = np.abs(np.array([float(t['amount']) for t in items]))
+        interval = float(np.median(days))
+        typical = float(np.median(amounts))
+        # Same merchant on a steady cadence for about the same amount
+        if not np.all(np.abs(amounts - typical) <= 0.1 * typical):
+            continue
+        for cadence, low, high in CADENCES:
+            if low <= interval <= high:
+                insights.append({
+                    'type': 'info',
+                    'kind': 'recurring',
+                    'category': category,
+                    'amount': round(typical, 2),
+                    'message': f"Recurring {cadence} charge: {items[-1].get('description')} "
+                               f"(${typical:.2f}, {len(items)} payments so far)."
+                })
+                break
+    return insights
+
+
+def category_anomalies(transactions, now):
+    """Flag recent expenses far above their category's usual amount.
+
+    Each recent expense is scored against the category's older expenses, so
+    one large purchase cannot hide itself by inflating the baseline.
+    """
+    recent_start = now - timedelta(days=RECENT_DAYS)
+    history = defaultdict(list)
+    recent = []
+    for t in _expenses(transactions):
+        if t['date'] >= recent_start:
+            recent.append(t)
+        else:
+            history[t['category']].append(-float(t['amount']))
+
+    insights = []
+    for t in recent:
+        baseline = np.array(history.get(t['category'], ()))
+        if len(baseline) < ANOMALY_MIN_HISTORY or baseline.std() == 0:
+            continue
+        amount = -float(t['amount'])
+        z = (amount - baseline.mean()) / baseline.std()
+        if z >= ANOMALY_Z:
+            insights.append({
+                'type': 'warning',
+                'kind': 'anomaly',
+                'category': t['category'],
+                'amount': round(amount, 2),
+                'zScore': round(float(z), 2),
+                'message': f"Unusual {t['category']} expense on {t['date']:%Y-%m-%d}: "
+                           f"${amount:.2f} versus a typical ${baseline.mean():.2f}."
+            })
+    return insights
+
+
+def month_over_month_spikes(transactions, now):
+    # This month's spend per category against the average of the three before
+    months = [(now.year * 12 + now.month - 1 - back) for back in range(4)]
+    totals = defaultdict(lambda: np.zeros(4))
+    for t in _expenses(transactions):
+        back = months[0] - (t['date'].year * 12 + t['date'].month - 1)
+        if 0 <= back < 4:
+            totals[t['category']][back] += -float(t['amount'])
+
+    insights = []
+    for category, amounts in totals.items():
+        current, average = amounts[0], amounts[1:].mean()
+        if current >= SPIKE_MIN_AMOUNT and average > 0 and current >= SPIKE_RATIO * average:
+            insights.append({
+                'type': 'warning',
+                'kind': 'spike',
+                'category': category,
+                'amount': round(float(current), 2),
+                'message': f"{category.capitalize()} spending this month (${current:.2f}) is "
+                           f"{current / average:.1f}x your recent monthly average (${average:.2f})."
+            })
+    return insights
+
+
+def unnecessary_spend(transactions, now):
+    # Many small discretionary purchases add up without being noticed
+    recent_start = now - timedelta(days=RECENT_DAYS)
+    small = defaultdict(list)
+    for t in _expenses(transactions):
+        amount = -float(t['amount'])
+        if (t['date'] >= recent_start and amount <= SMALL_PURCHASE
+                and t['category'].lower() in DISCRETIONARY_CATEGORIES):
+            small[t['category']].append(amount)
+
+    return [{
+        'type': 'tip',
+        'kind': 'unnecessary',
+        'category': category,
+        'amount': round(sum(amounts), 2),
+        'message': f"{len(amounts)} small {category} purchases in the last {RECENT_DAYS} days "
+                   f"add up to ${sum(amounts):.2f}. Consider cutting back."
+    } for category, amounts in small.items() if len(amounts) >= SMALL_PURCHASE_MIN_COUNT]
+
+
+RULES = (recurring_charges, category_anomalies, month_over_month_spikes, unnecessary_spend)
+
+
+def generate_insights(transactions, now=None):
+    """Run every local rule over ``transactions`` and return their insights.
+
+    ``transactions`` are documents with ``date``, ``description``,
+    ``category`` and ``amount``, as loaded for the analysis prompt. Nothing
+    here touches the network, so it is cheap enough for every dashboard load.
+    """
+    now = now or datetime.now()
+    insights = []
+    for rule in RULES:
+        insights.extend(rule(transactions, now))
+    return insights
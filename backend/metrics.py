@@ -0,0 +1,230 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from flask import g, request
+from pymongo import monitoring
+from config import Config
+from serialization import MongoJSONProvider
+
+logger = logging.getLogger('slow_requests')
+
+# Upper bounds of the histogram buckets, in seconds and in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Figures of the request being handled on this thread; None outside requests
+_current = ContextVar('request_stats', default=None)
+
+
+class Registry:
+    """Counters and histograms for this worker process, in Prometheus text format.
+
+    Like the pool and cache stats, each worker reports its own numbers;
+    the scraper sums them across workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _labels(labels, **extra):
+        pairs = list(labels) + list(extra.items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+    def render(self):
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._counters} |
+                           {name for name, _ in self._histograms})
+            for name in names:
+                if name in self._help:
+                    kind, text = self._help[name]
+                    lines.append(f'# HELP {name} {text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{self._labels(labels)} {value}')
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(histogram['buckets'], histogram['counts']):
+                        lines.append(f'{name}_bucket{self._labels(labels, le=bound)} {count}')
+                    lines.append(f'{name}_bucket{self._labels(labels, le="+Inf")} '
+                                 f'{histogram["count"]}')
+                    lines.append(f'{name}_sum{self._labels(labels)} {round(histogram["sum"], 6)}')
+                    lines.append(f'{name}_count{self._labels(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe('http_requests_total', 'counter', 'Requests by route, method and status.')
+registry.describe('http_request_duration_seconds', 'histogram', 'Request latency by route.')
+registry.describe('http_request_db_commands', 'histogram', 'Mongo commands issued per request.')
+registry.describe('http_request_db_seconds', 'histogram', 'Time spent in Mongo per request.')
+registry.describe('http_request_serialization_seconds', 'histogram',
+                  'Time spent encoding JSON per request.')
+registry.describe('http_response_size_bytes', 'histogram',
+                  'Response body size; streamed responses are not counted.')
+registry.describe('mongo_commands_total', 'counter', 'Mongo commands by name and outcome.')
+registry.describe('mongo_command_duration_seconds', 'histogram', 'Mongo command latency.')
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command and charges it to the current request.
+
+    pymongo publishes the events on the thread that ran the command, so
+    the context variable set by the request hooks is visible here.
+    """
+
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        registry.inc('mongo_commands_total', {'command': event.command_name, 'outcome': outcome})
+        registry.observe('mongo_command_duration_seconds', {'command': event.command_name},
+                         seconds, LATENCY_BUCKETS)
+        stats = _current.get()
+        if stats is not None:
+            stats['dbCommands'] += 1
+            stats['dbSeconds'] += seconds
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+
+command_metrics = CommandMetrics()
+
+
+class TimedJSONProvider(MongoJSONProvider):
+    # Charges JSON encoding time to the current request
+    def encode(self, obj):
+        stats = _current.get()
+        if stats is None:
+            return super().encode(obj)
+        started = time.perf_counter()
+        try:
+            return super().encode(obj)
+        finally:
+            stats['serializationSeconds'] += time.perf_counter() - started
+
+
+def _start(g):
+    g.request_stats = {'dbCommands': 0, 'dbSeconds': 0.0, 'serializationSeconds': 0.0,
+                       'started': time.perf_counter()}
+    g.request_stats_token = _current.set(g.request_stats)
+
+
+def _finish(stats, request, status, size):
+    duration = time.perf_counter() - stats['started']
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    labels = {'route': route, 'method': request.method}
+
+    registry.inc('http_requests_total', {**labels, 'status': status})
+    registry.observe('http_request_duration_seconds', labels, duration, LATENCY_BUCKETS)
+    registry.observe('http_request_db_commands', labels, stats['dbCommands'], COUNT_BUCKETS)
+    registry.observe('http_request_db_seconds', labels, stats['dbSeconds'], LATENCY_BUCKETS)
+    registry.observe('http_request_serialization_seconds', labels,
+                     stats['serializationSeconds'], LATENCY_BUCKETS)
+    if size is not None:
+        registry.observe('http_response_size_bytes', labels, size, SIZE_BUCKETS)
+
+    if duration * 1000 >= Config.SLOW_REQUEST_MS:
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': status,
+            'durationMs': round(duration * 1000, 2),
+            'dbCommands': stats['dbCommands'],
+            'dbMs': round(stats['dbSeconds'] * 1000, 2),
+            'serializationMs': round(stats['serializationSeconds'] * 1000, 2),
+            'bytes': size
+        }))
+
+
+def _before_request():
+    _start(g)
+
+
+def _after_request(response):
+    stats = g.get('request_stats')
+    if stats is not None:
+        size = None if response.is_streamed else response.calculate_content_length()
+        _finish(stats, request, response.status_code, size)
+    return response
+
+
+def _teardown_request(exc):
+    token = g.pop('request_stats_token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+def init_app(app):
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+def init_quart(app):
+    """The same metrics for the async Quart app in asgi.py.
+
+    The hooks are coroutines so they run in the request's task: that is
+    where the context variable must be set for the async Mongo client's
+    command events, and for work handed to asyncio.to_thread, which copies
+    the context. Each request runs in its own task, so nothing is reset.
+    """
+    from quart import g as quart_g, request as quart_request
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    async def before_request():
+        _start(quart_g)
+
+    @app.after_request
+    async def after_request(response):
+        stats = getattr(quart_g, 'request_stats', None)
+        if stats is not None:
+            _finish(stats, quart_request, response.status_code, response.content_length)
+        return response
@@ -26,7 +26,6 @@ class Balance:
     @staticmethod
     def get_balance_by_email(email):
         user_data = db.balance.find_one({'email': email})
-        print('user_data: ', user_data)
         if user_data:
             return {"income": user_data['income'], "expenses": user_data['expenses'], "balance": user_data['balance']}
         return None
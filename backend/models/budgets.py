@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from config import Config
+from database import get_database
+from models.rollup import SpendRollup
+
+db = get_database()
+
+
+def get_start_of_period(period):
+    now = datetime.now()
+    if period == 'daily':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'weekly':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=now.weekday())
+    elif period == 'monthly':
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    elif period == 'yearly':
+        return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        return now  # Default to current time if period is not recognized
+
+
+def aggregate_budget_spend(user_id, budgets):
+    # Sum spend per (category, period) with one grouped aggregation.
+    # Each distinct period start becomes its own conditional sum, so budgets
+    # on different periods for the same category share a single pass.
+    if not budgets:
+        return {}
+
+    period_starts = {budget['period']: get_start_of_period(budget['period'])
+                     for budget in budgets}
+    windows = {start: f'since_{i}'
+               for i, start in enumerate(sorted(set(period_starts.values())))}
+
+    group = {'_id': '$category'}
+    for start, key in windows.items():
+        group[key] = {'$sum': {'$cond': [
+            {'$gte': ['$date', start]}, {'$toLong': '$amount'}, 0]}}
+
+    pipeline = [
+        {'$match': {
+            'userId': user_id,
+            'category': {'$in': list({budget['category'] for budget in budgets})},
+            'date': {'$gte': min(windows)}
+        }},
+        {'$group': group}
+    ]
+    totals = {row['_id']: row for row in db.transactions.aggregate(pipeline)}
+
+    return {
+        (budget['category'], budget['period']): totals.get(budget['category'], {}).get(
+            windows[period_starts[budget['period']]], 0)
+        for budget in budgets
+    }
+
+
+class Budget:
+    @staticmethod
+    def get_spend(user_id, budgets):
+        # Spent amount keyed by (category, period), from rollups when enabled
+        if Config.SPEND_ROLLUPS:
+            return SpendRollup.get_budget_spend(user_id, budgets, datetime.now())
+        return aggregate_budget_spend(user_id, budgets)
+
+    @staticmethod
+    def find_for_categories(user_id, categories):
+        return list(db.budgets.find(
+            {'userId': user_id, 'category': {'$in': list(categories)}}))
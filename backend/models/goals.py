@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from config import Config
+from database import get_database
+from models.rollup import SpendRollup, bucket_start
+
+db = get_database()
+
+FORECAST_MONTHS = 12
+
+
+def goal_query(user_id, categories, tags):
+    # Goals follow transactions either by category or by tag
+    linked = [{'category': {'$in': list(categories)}}]
+    if tags:
+        linked.append({'tag': {'$in': list(tags)}})
+    return {'userId': user_id, '$or': linked}
+
+
+def contributes(goal, transaction):
+    if transaction['date'] < goal['startDate']:
+        return False
+    return (goal.get('category') is not None and transaction['category'] == goal['category']) \
+        or (goal.get('tag') is not None and goal['tag'] in transaction.get('tags', ()))
+
+
+class Goal:
+    """Savings goals whose progress comes from linked transactions.
+
+    A goal links to transactions by ``category`` or ``tag``. Every linked
+    transaction dated on or after its ``startDate`` adds its amount to the
+    goal's ``contributed``, which transaction writes keep current with
+    ``$inc``. ``currentAmount`` is the balance the user started the goal
+    with.
+    """
+
+    @staticmethod
+    def record(user_id, transactions, sign=1, session=None):
+        # Apply (sign=1) or revert (sign=-1) transactions on the linked goals
+        categories = {t['category'] for t in transactions}
+        tags = {tag for t in transactions for tag in t.get('tags', ())}
+        goals = list(db.goals.find(goal_query(user_id, categories, tags),
+                                   {'category': 1, 'tag': 1, 'startDate': 1},
+                                   session=session))
+        if not goals:
+            return
+
+        increments = {}
+        for goal in goals:
+            for transaction in transactions:
+                if contributes(goal, transaction):
+                    increments[goal['_id']] = increments.get(goal['_id'], 0) + \
+                        sign * abs(transaction['amount'])
+        if increments:
+            db.goals.bulk_write([
+                UpdateOne({'_id': goal_id}, {'$inc': {'contributed': value}})
+                for goal_id, value in increments.items()
+            ], ordered=False, session=session)
+
+    @staticmethod
+    def contributed_since(user_id, goal):
+        # One aggregation when a goal is created; writes keep it current after
+        linked = goal_query(user_id, [goal['category']] if goal.get('category') else [],
+                            [goal['tag']] if goal.get('tag') else [])
+        match = {**linked, 'date': {'$gte': goal['startDate']}}
+        total = next(db.transactions.aggregate([
+            {'$match': match},
+            {'$group': {'_id': None, 'total': {'$sum': {'$abs': '$amount'}}}}
+        ]), {'total': 0})['total']
+        return total
+
+    @staticmethod
+    def monthly_net(user_id, now):
+        # Net of the last FORECAST_MONTHS full months, oldest first
+        end = bucket_start(now, 'month') - timedelta(days=1)
+        start = bucket_start(end - timedelta(days=31 * (FORECAST_MONTHS - 1)), 'month')
+        # analytics needs numpy, which app startup does not import
+        from analytics import bucket_totals, dense_series
+        if Config.SPEND_ROLLUPS:
+            totals = SpendRollup.series(user_id, 'month', start, end)
+        else:
+            totals = bucket_totals(user_id, 'month', start, end)
+        if not totals:
+            return []
+        # Zero-filled from the first month with any activity
+        return dense_series(totals, 'month', min(totals), end)['net']
+
+    @staticmethod
+    def invalidate(user_id):
+        db.goal_progress.delete_one({'userId': user_id})
+
+    @staticmethod
+    def get_progress(user_id, data_version):
+        """Return the user's goals with progress and forecast.
+
+        Served from one ``goal_progress`` document, rebuilt only when a
+        transaction write moved ``dataVersion`` or a goal was created.
+        """
+        materialized = db.goal_progress.find_one({'userId': user_id})
+        if materialized is not None and materialized['dataVersion'] == data_version:
+            return materialized['goals']
+
+        from analytics import forecast_goals
+        now = datetime.now()
+        goals = list(db.goals.find({'userId': user_id}))
+        current = [float(goal.get('currentAmount') or 0) + goal.get('contributed', 0)
+                   for goal in goals]
+        forecast = forecast_goals([float(goal['targetAmount']) for goal in goals], current,
+                                  [goal['deadline'] for goal in goals],
+                                  Goal.monthly_net(user_id, now), now)
+
+        progress = []
+        for i, goal in enumerate(goals):
+            target = float(goal['targetAmount'])
+            progress.append({
+                **goal,
+                '_id': str(goal['_id']),
+                'userId': str(goal['userId']),
+                'currentAmount': current[i],
+                'progress': round(min(current[i] / target, 1), 4) if target > 0 else 1,
+                'projectedDate': forecast['projected'][i],
+                'onTrack': forecast['onTrack'][i],
+                'requiredMonthly': forecast['requiredMonthly'][i],
+                'savingsRate': forecast['savingsRate']
+            })
+
+        db.goal_progress.update_one(
+            {'userId': user_id},
+            {'$set': {'goals': progress, 'dataVersion': data_version, 'updatedAt': now}},
+            upsert=True)
+        return progress
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from database import get_database
+
+db = get_database()
+
+
+class BalanceLedger:
+    """Append-only log of every change to a user's balance.
+
+    Each entry is written before the matching ``$inc`` on
+    ``users.totalBalance``. The reconciler folds settled entries into a
+    checkpoint kept on the user's ``balance`` document, so the correct
+    balance is always checkpoint + a few recent deltas, never a
+    full-history sum.
+    """
+
+    @staticmethod
+    def append(user_id, delta, source, transaction_id=None, session=None):
+        db.balance_ledger.insert_one({
+            'userId': user_id,
+            'delta': delta,
+            'source': source,
+            'transactionId': transaction_id,
+            'createdAt': datetime.now()
+        }, session=session)
+
+    @staticmethod
+    def _full_balance(user_id):
+        # Legacy blueprint documents store the owner in 'user'
+        return next(db.transactions.aggregate([
+            {'$match': {'$or': [{'userId': user_id}, {'user': user_id}]}},
+            {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
+        ]), {'total': 0})['total']
+
+    @staticmethod
+    def reconcile_user(user_id, settle_seconds=60):
+        """Fold settled ledger entries into the checkpoint and repair drift.
+
+        Entries younger than ``settle_seconds`` may still be missing their
+        ``$inc``, so they wait for the next run, and ``totalBalance`` is only
+        corrected while the user has none of them. The first run for a user
+        starts the checkpoint from one full sum of their transactions, and
+        is skipped if a write lands while that sum runs.
+        Returns the drift that was corrected.
+        """
+        now = datetime.now()
+        # ObjectIds carry UTC seconds
+        cutoff = ObjectId.from_datetime(
+            datetime.now(timezone.utc) - timedelta(seconds=settle_seconds))
+        user = db.users.find_one({'email': user_id}, {'totalBalance': 1, 'dataVersion': 1})
+        settled = db.balance_ledger.find_one(
+            {'userId': user_id, '_id': {'$gte': cutoff}}) is None
+        checkpoint = db.balance.find_one(
+            {'email': user_id, 'ledgerCheckpoint': {'$exists': True}})
+
+        if checkpoint is None:
+            if not settled:
+                return 0
+            last = db.balance_ledger.find_one({'userId': user_id}, sort=[('_id', -1)])
+            balance = BalanceLedger._full_balance(user_id)
+            last_id = last['_id'] if last else None
+            # A write that landed during the sum is in it and would be folded
+            # again from its ledger entry; start the checkpoint next run
+            newer = {'userId': user_id}
+            if last_id is not None:
+                newer['_id'] = {'$gt': last_id}
+            after = db.users.find_one({'email': user_id}, {'dataVersion': 1})
+            if ((after or {}).get('dataVersion') != (user or {}).get('dataVersion')
+                    or db.balance_ledger.find_one(newer) is not None):
+                return 0
+        else:
+            balance = checkpoint['balance']
+            last_id = checkpoint['ledgerCheckpoint']
+            ids = {'$lt': cutoff}
+            if last_id is not None:
+                ids['$gt'] = last_id
+            for entry in db.balance_ledger.find(
+                    {'userId': user_id, '_id': ids}, {'delta': 1}).sort('_id', 1):
+                balance += entry['delta']
+                last_id = entry['_id']
+
+        db.balance.update_one(
+            {'email': user_id},
+            {'$set': {'balance': balance, 'ledgerCheckpoint': last_id,
+                      'reconciledAt': now, 'updatedAt': now},
+             '$setOnInsert': {'income': 0, 'expenses': 0, 'createdAt': now}},
+            upsert=True)
+
+        drift = balance - user.get('totalBalance', 0) if user else 0
+        if not settled or not drift:
+            return 0
+        # A write that landed meanwhile bumped dataVersion; retry next run
+        result = db.users.update_one(
+            {'email': user_id, 'dataVersion': user.get('dataVersion')},
+            {'$set': {'totalBalance': balance}})
+        return drift if result.modified_count else 0
+
+    @staticmethod
+    def reconcile(user_id=None, settle_seconds=60, lookback_hours=24):
+        # Without a user, reconcile everyone with ledger activity in the lookback
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            since = ObjectId.from_datetime(
+                datetime.now(timezone.utc) - timedelta(hours=lookback_hours))
+            user_ids = db.balance_ledger.distinct('userId', {'_id': {'$gte': since}})
+
+        corrected = {}
+        for user in user_ids:
+            drift = BalanceLedger.reconcile_user(user, settle_seconds)
+            if drift:
+                corrected[user] = drift
+        return corrected
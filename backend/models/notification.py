@@ -0,0 +1,123 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import get_database
+from models.budgets import Budget, get_start_of_period
+
+db = get_database()
+
+DUPLICATE_KEY = 11000
+
+
+def budget_notification_key(user_id, category, period, period_start):
+    # One notification per budget per period window
+    return f"budget:{user_id}:{category}:{period}:{period_start.date().isoformat()}"
+
+
+def budget_limit(budget):
+    # Amounts arrive unvalidated from clients; a budget without a usable
+    # limit is skipped rather than failing the write that triggered it
+    try:
+        return float(budget['amount'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Notification:
+    @staticmethod
+    def evaluate_budgets(user_id, categories):
+        """Upsert an exceeded-budget notification for the given categories.
+
+        Runs after transaction and budget writes. Each (user, category,
+        period) window has one notification whose spend figure is refreshed
+        in place, so repeated writes never add duplicates.
+        """
+        categories = {category for category in categories if category != 'income'}
+        if not categories:
+            return 0
+
+        budgets = Budget.find_for_categories(user_id, categories)
+        if not budgets:
+            return 0
+        spent_by_budget = Budget.get_spend(user_id, budgets)
+
+        now = datetime.now()
+        operations = []
+        for budget in budgets:
+            # Expenses are stored as negative amounts
+            spent = -spent_by_budget.get((budget['category'], budget['period']), 0)
+            limit = budget_limit(budget)
+            if limit is None or spent <= limit:
+                continue
+
+            period_start = get_start_of_period(budget['period'])
+            operations.append(UpdateOne(
+                {'key': budget_notification_key(
+                    user_id, budget['category'], budget['period'], period_start)},
+                {
+                    '$set': {
+                        'message': f"Budget limit exceeded for {budget['category']}. "
+                                   f"Spent: ${int(spent):.2f}, Limit: ${limit:.2f}",
+                        'spent': spent,
+                        'limit': limit,
+                        'updatedAt': now
+                    },
+                    '$setOnInsert': {
+                        'userId': user_id,
+                        'category': budget['category'],
+                        'period': budget['period'],
+                        'periodStart': period_start,
+                        'createdAt': now,
+                        'read': False
+                    }
+                },
+                upsert=True))
+
+        if operations:
+            try:
+                created = db.notifications.bulk_write(
+                    operations, ordered=False).upserted_count
+            except BulkWriteError as e:
+                # A concurrent write upserted the same key first; that one stands
+                if any(error['code'] != DUPLICATE_KEY for error in e.details['writeErrors']):
+                    raise
+                created = e.details['nUpserted']
+            Notification.adjust_unread(user_id, created)
+        return len(operations)
+
+    @staticmethod
+    def unread_count(user_id):
+        counter = db.notification_counters.find_one({'userId': user_id})
+        if counter is None:
+            # First read for a user whose notifications predate the counter
+            unread = db.notifications.count_documents(
+                {'userId': user_id, 'read': False})
+            db.notification_counters.update_one(
+                {'userId': user_id}, {'$setOnInsert': {'unread': unread}}, upsert=True)
+            return unread
+        return max(counter['unread'], 0)
+
+    @staticmethod
+    def adjust_unread(user_id, delta):
+        # No upsert: a missing counter is initialized from a count on first read
+        if delta:
+            db.notification_counters.update_one(
+                {'userId': user_id}, {'$inc': {'unread': delta}})
+
+    @staticmethod
+    def mark_read(user_id, notification_ids=None):
+        # Mark the given notifications (or all of them) read in one update.
+        # readAt also starts the retention clock of the TTL index.
+        query = {'userId': user_id, 'read': False}
+        if notification_ids is not None:
+            query['_id'] = {'$in': [ObjectId(i) for i in notification_ids]}
+
+        result = db.notifications.update_many(
+            query, {'$set': {'read': True, 'readAt': datetime.now()}})
+        if notification_ids is None:
+            db.notification_counters.update_one(
+                {'userId': user_id}, {'$set': {'unread': 0}}, upsert=True)
+        else:
+            Notification.adjust_unread(user_id, -result.modified_count)
+        return result.modified_count
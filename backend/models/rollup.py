@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from database import get_database
+
+db = get_database()
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+# Budget periods map onto the rollup bucket that starts the current period
+PERIOD_GRANULARITY = {
+    'daily': 'day',
+    'weekly': 'week',
+    'monthly': 'month',
+    'yearly': 'year'
+}
+
+
+def bucket_start(date, granularity):
+    day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    elif granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    elif granularity == 'month':
+        return day.replace(day=1)
+    elif granularity == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def next_bucket(bucket, granularity):
+    if granularity == 'day':
+        return bucket + timedelta(days=1)
+    elif granularity == 'week':
+        return bucket + timedelta(days=7)
+    elif granularity == 'month':
+        return bucket.replace(year=bucket.year + bucket.month // 12,
+                              month=bucket.month % 12 + 1)
+    elif granularity == 'year':
+        return bucket.replace(year=bucket.year + 1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def rollup_increments(amount, sign=1):
+    # Mirror the int() truncation the budget and dashboard reads have always used
+    value = int(amount)
+    return {
+        'income': sign * value if value > 0 else 0,
+        'expenses': sign * abs(value) if value <= 0 else 0,
+        'total': sign * amount,
+        'count': sign
+    }
+
+
+def fold_increments(transactions, sign=1):
+    # Sum increments per (userId, category, granularity, bucket) key
+    totals = {}
+    for transaction in transactions:
+        increments = rollup_increments(transaction['amount'], sign)
+        for granularity in GRANULARITIES:
+            key = (transaction['userId'], transaction['category'], granularity,
+                   bucket_start(transaction['date'], granularity))
+            bucket = totals.setdefault(key, dict.fromkeys(increments, 0))
+            for field, value in increments.items():
+                bucket[field] += value
+    return totals
+
+
+class SpendRollup:
+    """Per-user spend totals bucketed by category and day/week/month/year.
+
+    Documents are keyed by (userId, category, granularity, bucket) and hold
+    running ``income``, ``expenses``, ``total`` and ``count`` values that the
+    transaction write routes keep current with ``$inc`` upserts.
+    """
+
+    @staticmethod
+    def record(transaction, sign=1):
+        # Apply (sign=1) or revert (sign=-1) a transaction in every granularity
+        increments = rollup_increments(transaction['amount'], sign)
+        db.spend_rollups.bulk_write([
+            UpdateOne({
+                'userId': transaction['userId'],
+                'category': transaction['category'],
+                'granularity': granularity,
+                'bucket': bucket_start(transaction['date'], granularity)
+            }, {'$inc': increments}, upsert=True)
+            for granularity in GRANULARITIES
+        ], ordered=False)
+
+    @staticmethod
+    def record_many(transactions, sign=1, session=None):
+        # Fold a batch of transactions into one bulk write, one upsert per bucket
+        totals = fold_increments(transactions, sign)
+        if not totals:
+            return
+
+        db.spend_rollups.bulk_write([
+            UpdateOne({'userId': user, 'category': category,
+                       'granularity': granularity, 'bucket': bucket},
+                      {'$inc': values}, upsert=True)
+            for (user, category, granularity, bucket), values in totals.items()
+        ], ordered=False, session=session)
+
+    @staticmethod
+    def find_buckets(user_id, granularity, start, end=None, categories=None):
+        query = {'userId': user_id, 'granularity': granularity,
+                 'bucket': {'$gte': start}}
+        if end is not None:
+            query['bucket']['$lte'] = end
+        if categories is not None:
+            query['category'] = {'$in': list(categories)}
+        return db.spend_rollups.find(query)
+
+    @staticmethod
+    def series(user_id, granularity, start, end):
+        # Income and expenses per bucket, summed over categories
+        totals = {}
+        for bucket in SpendRollup.find_buckets(
+                user_id, granularity, bucket_start(start, granularity), end):
+            income, expenses = totals.get(bucket['bucket'], (0, 0))
+            totals[bucket['bucket']] = (income + bucket['income'],
+                                        expenses + bucket['expenses'])
+        return totals
+
+    @staticmethod
+    def get_budget_spend(user_id, budgets, now):
+        # Spend for the current period of each budget, read from one bucket apiece
+        periods = {budget['period'] for budget in budgets
+                   if budget['period'] in PERIOD_GRANULARITY}
+        if not periods:
+            return {}
+
+        buckets = {period: bucket_start(now, PERIOD_GRANULARITY[period])
+                   for period in periods}
+        rows = db.spend_rollups.find({
+            'userId': user_id,
+            'category': {'$in': list({budget['category'] for budget in budgets})},
+            '$or': [{'granularity': PERIOD_GRANULARITY[period], 'bucket': bucket}
+                    for period, bucket in buckets.items()]
+        })
+        spent = {(row['category'], row['granularity']): row['income'] - row['expenses']
+                 for row in rows}
+
+        return {
+            (budget['category'], budget['period']): spent.get(
+                (budget['category'], PERIOD_GRANULARITY[budget['period']]), 0)
+            for budget in budgets if budget['period'] in periods
+        }
+
+    @staticmethod
+    def rebuild(user_id=None, batch_size=1000):
+        # Recompute rollups from raw transactions, for backfills and repairs
+        query = {'userId': user_id} if user_id else {}
+        db.spend_rollups.delete_many(query)
+
+        cursor = db.transactions.find(
+            query, {'userId': 1, 'category': 1, 'date': 1, 'amount': 1},
+            batch_size=batch_size)
+        # Legacy documents from the blueprint routes store string dates
+        totals = fold_increments(
+            transaction for transaction in cursor
+            if 'userId' in transaction and isinstance(transaction.get('date'), datetime))
+
+        documents = [
+            {'userId': user, 'category': category, 'granularity': granularity,
+             'bucket': bucket, **values}
+            for (user, category, granularity, bucket), values in totals.items()
+        ]
+        for i in range(0, len(documents), batch_size):
+            db.spend_rollups.insert_many(documents[i:i + batch_size])
+        return len(documents)
@@ -1,18 +1,26 @@
-from flask_pymongo import PyMongo
-from werkzeug.security import generate_password_hash, check_password_hash
 from database import get_database
+from models.ledger import BalanceLedger
+from passwords import hash_password, needs_rehash, verify_password
 
 db = get_database()
 
 
 class User:
-    def __init__(self, name, email, password):
+    def __init__(self, name, email, password=None, password_hash=None):
         self.name = name
         self.email = email
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password) if password is not None else password_hash
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not verify_password(self.password_hash, password):
+            return False
+        # Upgrade hashes made with an older hasher or cost while the
+        # plaintext is at hand
+        if needs_rehash(self.password_hash):
+            self.password_hash = hash_password(password)
+            db.users.update_one({'email': self.email},
+                                {'$set': {'password_hash': self.password_hash}})
+        return True
 
     @staticmethod
     def create_user(name, email, password):
@@ -28,7 +36,16 @@ class User:
     def get_user_by_email(email):
         user_data = db.users.find_one({'email': email})
         if user_data:
-            user = User(user_data['name'], user_data['email'], '')
-            user.password_hash = user_data['password_hash']
-            return user
+            return User(user_data['name'], user_data['email'],
+                        password_hash=user_data['password_hash'])
         return None
+
+    @staticmethod
+    def apply_balance_delta(email, delta, source, transaction_id=None, session=None):
+        # Every transaction write goes through here; dataVersion invalidates
+        # cached responses built from the user's transactions. The ledger
+        # entry goes first so the reconciler never misses an applied delta.
+        BalanceLedger.append(email, delta, source, transaction_id, session=session)
+        db.users.update_one(
+            {'email': email},
+            {'$inc': {'totalBalance': delta, 'dataVersion': 1}}, session=session)
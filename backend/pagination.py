@@ -0,0 +1,89 @@
+import base64
+import binascii
+from bson import json_util
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # Opaque, URL-safe token holding the sort key of the last returned row
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token, size):
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
+
+
+def keyset_filter(keys, values):
+    # Rows strictly after `values` when sorting descending on every key:
+    # (k1 < v1) or (k1 == v1 and k2 < v2) or ...
+    clauses = []
+    for i, key in enumerate(keys):
+        clause = dict(zip(keys[:i], values[:i]))
+        clause[key] = {'$lt': values[i]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+def paginate(collection, query, keys, limit, cursor=None, projection=None):
+    """Fetch one page of ``collection`` sorted descending on ``keys``.
+
+    Returns the documents and the cursor for the next page, which is None
+    once the last page has been read. One extra row is fetched to tell
+    whether another page exists, so no count query is needed. A ``limit``
+    of None returns every matching document.
+    """
+    documents = list(collection.find(page_query(query, keys, cursor), projection)
+                     .sort([(key, -1) for key in keys])
+                     .limit(fetch_limit(limit)))
+    return split_page(documents, keys, limit)
+
+
+async def paginate_async(collection, query, keys, limit, cursor=None, projection=None):
+    # paginate() for an async pymongo collection
+    documents = await (collection.find(page_query(query, keys, cursor), projection)
+                       .sort([(key, -1) for key in keys])
+                       .limit(fetch_limit(limit))).to_list()
+    return split_page(documents, keys, limit)
+
+
+def fetch_limit(limit):
+    # 0 is no limit to the server
+    return limit + 1 if limit is not None else 0
+
+
+def page_query(query, keys, cursor):
+    if not cursor:
+        return query
+    return {'$and': [query, keyset_filter(keys, decode_cursor(cursor, len(keys)))]}
+
+
+def split_page(documents, keys, limit):
+    next_cursor = None
+    if limit is not None and len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor([documents[-1][key] for key in keys])
+    return documents, next_cursor
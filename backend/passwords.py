@@ -0,0 +1,103 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from werkzeug.security import check_password_hash, generate_password_hash
+from config import Config
+
+HASHERS = ('scrypt', 'pbkdf2', 'bcrypt')
+# bcrypt only reads the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+_executor = None
+_executor_pid = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing pool is saturated; callers answer 503."""
+
+
+def _method():
+    # The werkzeug method string for the configured hasher and cost
+    if Config.PASSWORD_HASHER == 'pbkdf2':
+        return f"pbkdf2:sha256:{Config.PASSWORD_PBKDF2_ITERATIONS}"
+    if Config.PASSWORD_HASHER == 'scrypt':
+        return f"scrypt:{Config.PASSWORD_SCRYPT_N}:8:1"
+    raise ValueError(f"Unknown password hasher: {Config.PASSWORD_HASHER}")
+
+
+def _bcrypt_bytes(password):
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+
+def _hash(password):
+    if Config.PASSWORD_HASHER == 'bcrypt':
+        import bcrypt
+        return bcrypt.hashpw(_bcrypt_bytes(password),
+                             bcrypt.gensalt(Config.PASSWORD_BCRYPT_ROUNDS)).decode('ascii')
+    return generate_password_hash(password, method=_method())
+
+
+def _verify(password_hash, password):
+    if password_hash.startswith('$2'):
+        import bcrypt
+        return bcrypt.checkpw(_bcrypt_bytes(password), password_hash.encode('ascii'))
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    # True when the stored hash was made with another hasher or cost
+    if Config.PASSWORD_HASHER == 'bcrypt':
+        return not password_hash.startswith('$2') or \
+            int(password_hash.split('$')[2]) != Config.PASSWORD_BCRYPT_ROUNDS
+    return password_hash.split('$', 1)[0] != _method()
+
+
+def _get_executor():
+    # Worker threads do not survive a fork, so each process starts its own pool
+    global _executor, _executor_pid, _slots
+    if _executor is None or _executor_pid != os.getpid():
+        with _lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix='hashing')
+                _slots = threading.BoundedSemaphore(
+                    Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE)
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(function, *args):
+    """Run a hash on the bounded pool and wait for it.
+
+    At most PASSWORD_HASH_WORKERS hashes run at once (hashlib and bcrypt
+    release the GIL while they work) with PASSWORD_HASH_QUEUE more queued
+    behind them. A caller that finds no place within PASSWORD_HASH_TIMEOUT
+    seconds, or whose hash takes longer, gets HashingBusy, so a login burst
+    fails fast instead of stacking every worker thread up behind the CPU.
+    """
+    executor = _get_executor()
+    slots = _slots
+    if not slots.acquire(timeout=Config.PASSWORD_HASH_TIMEOUT):
+        raise HashingBusy('Too many concurrent password checks')
+    # The slot is held until the hash finishes, even if the caller gave up
+    try:
+        future = executor.submit(function, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        raise HashingBusy('Password check timed out')
+
+
+def hash_password(password):
+    return _run(_hash, password)
+
+
+def verify_password(password_hash, password):
+    return _run(_verify, password_hash, password)
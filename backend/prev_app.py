@@ -2,12 +2,10 @@
 
 from routes import auth, transactions, data
 from flask import Flask, jsonify
-from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS  # Import CORS correctly
 from config import Config
 
-mongo = PyMongo()  # Create a PyMongo instance
 jwt = JWTManager()
 
 
@@ -15,7 +13,6 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    mongo.init_app(app)  # Initialize PyMongo with the app
     jwt.init_app(app)    # Initialize JWTManager with the app
     CORS(app)            # Correctly initialize CORS with the app
 
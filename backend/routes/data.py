@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from database import get_database
+from models.user import User
 from models.balance import Balance
 db = get_database()
 
@@ -67,6 +68,8 @@ def add_transaction():
         'description': data.get('description', '')
     }
     result = db.transactions.insert_one(transaction)
+    User.apply_balance_delta(current_user, float(data['amount']), 'create',
+                             result.inserted_id)
     return jsonify({"msg": "Transaction added", "id": str(result.inserted_id)}), 201
 
 
@@ -75,11 +78,15 @@ def add_transaction():
 def update_transaction(transaction_id):
     current_user = get_jwt_identity()
     data = request.get_json()
-    result = db.transactions.update_one(
+    previous = db.transactions.find_one_and_update(
         {'_id': ObjectId(transaction_id), 'user': current_user},
         {'$set': data}
     )
-    if result.modified_count:
+    if previous:
+        if 'amount' in data:
+            User.apply_balance_delta(
+                current_user, float(data['amount']) - float(previous['amount']),
+                'update', previous['_id'])
         return jsonify({"msg": "Transaction updated"}), 200
     return jsonify({"msg": "Transaction not found or unauthorized"}), 404
 
@@ -88,9 +95,11 @@ def update_transaction(transaction_id):
 @jwt_required()
 def delete_transaction(transaction_id):
     current_user = get_jwt_identity()
-    result = db.transactions.delete_one(
+    deleted = db.transactions.find_one_and_delete(
         {'_id': ObjectId(transaction_id), 'user': current_user})
-    if result.deleted_count:
+    if deleted:
+        User.apply_balance_delta(current_user, -float(deleted['amount']), 'delete',
+                                 deleted['_id'])
         return jsonify({"msg": "Transaction deleted"}), 200
     return jsonify({"msg": "Transaction not found or unauthorized"}), 404
 
@@ -2,6 +2,7 @@ from bson import ObjectId
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import Blueprint, request, jsonify
 from database import get_database
+from models.user import User
 db = get_database()
 
 bp = Blueprint('transactions', __name__)
@@ -11,7 +12,6 @@ bp = Blueprint('transactions', __name__)
 @jwt_required()
 def get_transactions():
     try:
-        print('pinged')
         current_user = get_jwt_identity()
         transactions = list(db.transactions.find({'user': current_user}))
         for transaction in transactions:
@@ -34,6 +34,8 @@ def add_transaction():
         'description': data.get('description', '')
     }
     result = db.transactions.insert_one(transaction)
+    User.apply_balance_delta(current_user, float(data['amount']), 'create',
+                             result.inserted_id)
     return jsonify({"msg": "Transaction added", "id": str(result.inserted_id)}), 201
 
 
@@ -42,11 +44,15 @@ def add_transaction():
 def update_transaction(transaction_id):
     current_user = get_jwt_identity()
     data = request.get_json()
-    result = db.transactions.update_one(
+    previous = db.transactions.find_one_and_update(
         {'_id': ObjectId(transaction_id), 'user': current_user},
         {'$set': data}
     )
-    if result.modified_count:
+    if previous:
+        if 'amount' in data:
+            User.apply_balance_delta(
+                current_user, float(data['amount']) - float(previous['amount']),
+                'update', previous['_id'])
         return jsonify({"msg": "Transaction updated"}), 200
     return jsonify({"msg": "Transaction not found or unauthorized"}), 404
 
@@ -55,9 +61,11 @@ def update_transaction(transaction_id):
 @jwt_required()
 def delete_transaction(transaction_id):
     current_user = get_jwt_identity()
-    result = db.transactions.delete_one(
+    deleted = db.transactions.find_one_and_delete(
         {'_id': ObjectId(transaction_id), 'user': current_user})
-    if result.deleted_count:
+    if deleted:
+        User.apply_balance_delta(current_user, -float(deleted['amount']), 'delete',
+                                 deleted['_id'])
         return jsonify({"msg": "Transaction deleted"}), 200
     return jsonify({"msg": "Transaction not found or unauthorized"}), 404
 
@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from decimal import Decimal
+from bson import Decimal128, ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Numpy scalars and arrays come out of the analytics engine; dict keys that
+# are not strings are converted the way the standard library does
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def json_default(obj):
+    # Types that come straight out of Mongo documents
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, 'item'):
+        # numpy scalars, for the standard-library fallback
+        return obj.item()
+    return DefaultJSONProvider.default(obj)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes Mongo documents as they come.
+
+    ObjectIds become strings, datetimes ISO 8601 strings (exactly what
+    ``isoformat()`` gives) and Decimals strings, so routes can return
+    cursor documents without converting them field by field. Encoding uses
+    orjson when it is installed and the standard library otherwise; both
+    produce the same values.
+    """
+
+    default = staticmethod(json_default)
+    sort_keys = False
+
+    def encode(self, obj):
+        if orjson is None:
+            return super().dumps(obj).encode('utf-8')
+        return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS)
+
+    def dumps(self, obj, **kwargs):
+        # Formatting options are only understood by the standard library
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Straight to bytes, skipping the str round trip of the default
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+os.environ.setdefault('LLM_CLIENT', 'stub')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key-with-enough-length')
+
+# Every MongoClient created by the app talks to the same in-memory server
+mongomock.patch(servers=(('localhost', 27017),)).start()
+
+
+@pytest.fixture
+def app():
+    import app as app_module
+    app_module.app.config['TESTING'] = True
+    yield app_module.app
+    app_module.db.client.drop_database('finance_tracker')
+    app_module.dashboard_cache.backend.clear()
+    app_module.profile_cache.backend.clear()
+
+
+@pytest.fixture
+def db(app):
+    import app as app_module
+    return app_module.db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity='test@example.com')
+    return {'Authorization': f'Bearer {token}'}
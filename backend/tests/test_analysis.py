@@ -0,0 +1,157 @@
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import analysis
+
+
+def add(client, headers, description, amount=20):
+    client.post('/api/transactions', headers=headers, json={
+        'description': description, 'amount': amount, 'category': 'food',
+        'date': datetime.now().strftime('%Y-%m-%d')})
+
+
+def test_analysis_is_cached_until_transactions_change(client, auth_headers):
+    stub = analysis.get_llm_client()
+    stub.calls.clear()
+    add(client, auth_headers, 'Coffee')
+
+    first = client.get('/api/analyze-transactions', headers=auth_headers).get_json()
+    second = client.get('/api/analyze-transactions', headers=auth_headers).get_json()
+    assert second == {**first, 'cached': True}
+    assert len(stub.calls) == 1
+
+    add(client, auth_headers, 'Cinema')
+    third = client.get('/api/analyze-transactions', headers=auth_headers).get_json()
+    assert 'cached' not in third
+    assert len(stub.calls) == 2
+
+
+def test_async_mode_returns_job_to_poll(client, auth_headers):
+    add(client, auth_headers, 'Groceries')
+
+    response = client.get('/api/analyze-transactions?async=true', headers=auth_headers)
+    assert response.status_code == 202
+    job_id = response.get_json()['jobId']
+
+    deadline = time.monotonic() + 5
+    while True:
+        job = client.get(f'/api/analyze-transactions/jobs/{job_id}',
+                         headers=auth_headers).get_json()
+        if job['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+
+    assert job['status'] == 'done'
+    assert job['analysis'].startswith('Stub analysis')
+
+
+def test_stale_job_is_replaced(app, db, monkeypatch):
+    # A job whose worker died stays queued; it must not be handed out forever
+    dead = {'userId': 'test@example.com', 'inputHash': 'h', 'status': 'running',
+            'createdAt': datetime.now() - timedelta(hours=1)}
+    db.analysis_jobs.insert_one(dead)
+    monkeypatch.setattr(analysis, 'get_executor',
+                        lambda: SimpleNamespace(submit=lambda *args: None))
+
+    job = analysis.submit_job('test@example.com', 'prompt', 'h')
+
+    assert job['_id'] != dead['_id']
+    assert analysis.submit_job('test@example.com', 'prompt', 'h')['_id'] == job['_id']
+    assert db.analysis_jobs.find_one({'_id': dead['_id']})['status'] == 'failed'
+
+
+def test_prompt_aggregates_recurring_items_within_token_budget():
+    from compaction import count_tokens
+
+    transactions = [
+        {'date': datetime(2025, month, 3), 'description': f'NETFLIX.COM {month}04',
+         'category': 'subscriptions', 'amount': -15.99}
+        for month in range(1, 13)
+    ] + [
+        {'date': datetime(2025, 6, day), 'description': f'Shop {day}',
+         'category': 'shopping', 'amount': -day}
+        for day in range(1, 29)
+    ]
+
+    prompt = analysis.build_prompt(transactions, token_budget=200)
+    assert count_tokens(prompt) <= 200
+    assert prompt.count('NETFLIX') == 1
+    assert 'in 12 months' in prompt
+    assert 'Most recent transactions' not in prompt
+
+    assert 'Most recent transactions' in analysis.build_prompt(transactions, token_budget=5000)
+
+
+def test_local_insights_find_recurring_anomalies_and_spikes():
+    from insights import generate_insights
+
+    now = datetime(2025, 6, 20)
+    transactions = [
+        {'date': datetime(2025, month, 1), 'description': 'Gym membership',
+         'category': 'health', 'amount': -40}
+        for month in range(1, 7)
+    ] + [
+        {'date': datetime(2025, month, day), 'description': 'Lunch',
+         'category': 'food', 'amount': -(8 + 3 * (day % 5))}
+        for month in range(2, 6) for day in (3, 10, 17)
+    ] + [
+        {'date': datetime(2025, 6, 15), 'description': 'Tasting menu',
+         'category': 'food', 'amount': -150},
+    ]
+
+    kinds = {(i['kind'], i['category']) for i in generate_insights(transactions, now)}
+    assert ('recurring', 'health') in kinds
+    assert ('anomaly', 'food') in kinds
+    assert ('spike', 'food') in kinds
+    assert ('recurring', 'food') not in kinds
+
+
+def test_analysis_can_use_local_insights(client, auth_headers):
+    add(client, auth_headers, 'Coffee')
+    stub = analysis.get_llm_client()
+    stub.calls.clear()
+
+    local = client.get('/api/analyze-transactions?source=local', headers=auth_headers)
+    assert local.status_code == 200
+    assert 'analysis' not in local.get_json() and not stub.calls
+
+    both = client.get('/api/analyze-transactions?source=both', headers=auth_headers).get_json()
+    assert 'insights' in both and 'analysis' in both
+
+
+def dashboard_insights(client, db, auth_headers, transactions, time_range):
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    db.transactions.insert_many([{'userId': 'test@example.com', **t} for t in transactions])
+    response = client.get(f'/api/dashboard?timeRange={time_range}', headers=auth_headers)
+    assert response.status_code == 200
+    return {(i.get('kind'), i.get('category')) for i in response.get_json()['insights']}
+
+
+def test_dashboard_insights_see_enough_history(client, db, auth_headers):
+    # Steady daily spending is no spike, however short the dashboard range,
+    # and an outlier this week still stands out against the older months
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    transactions = [{'date': today - timedelta(days=days_ago), 'description': 'Dinner',
+                     'category': 'dining', 'amount': -10} for days_ago in range(1, 130)]
+    transactions += [{'date': today - timedelta(days=days_ago), 'description': f'Shop {days_ago}',
+                      'category': 'food', 'amount': -(10 + days_ago // 7 % 4)}
+                     for days_ago in range(35, 110, 7)]
+    transactions.append({'date': today, 'description': 'Banquet', 'category': 'food',
+                         'amount': -400})
+
+    kinds = dashboard_insights(client, db, auth_headers, transactions, 'week')
+
+    assert ('spike', 'dining') not in kinds
+    assert ('anomaly', 'food') in kinds
+
+
+def test_dashboard_insights_accept_uncategorized_expenses(client, db, auth_headers):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    transactions = [{'date': today - timedelta(days=days_ago), 'description': 'Cash',
+                     'category': None, 'amount': -5} for days_ago in range(10)]
+
+    kinds = dashboard_insights(client, db, auth_headers, transactions, 'month')
+
+    # Counted as 'other' rather than failing the dashboard
+    assert ('unnecessary', 'other') in kinds
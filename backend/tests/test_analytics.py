@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from analytics import TransactionFrame, bucket_totals, dense_series, period_over_period
+from config import Config
+
+START = datetime(2026, 3, 1)
+DOCUMENTS = [
+    {'date': START - timedelta(days=3), 'amount': 500.0, 'category': 'income'},
+    {'date': START, 'amount': 1200.9, 'category': 'income'},
+    {'date': START, 'amount': -30.5, 'category': 'food'},
+    {'date': START + timedelta(days=2), 'amount': -12.2, 'category': 'food'},
+    {'date': START + timedelta(days=2), 'amount': -0.4, 'category': 'fees'},
+    {'date': START + timedelta(days=4), 'amount': -99.0, 'category': 'rent'},
+]
+
+
+def test_period_over_period_matches_per_row_truncation():
+    frame = TransactionFrame.from_documents(DOCUMENTS)
+
+    current, previous = period_over_period(
+        frame, START - timedelta(days=5), START, START + timedelta(days=5))
+
+    assert current['income'] == 1200
+    assert current['expenses'] == 30 + 12 + 99
+    assert current['spendingByCategory'] == {'fees': 0, 'food': 42, 'rent': 99}
+    assert previous['net'] == 500.0
+
+
+def test_dense_series_zero_fills_week_and_month_buckets():
+    # Keys as bucket_start/$dateTrunc produce them: Mondays and month starts
+    weekly = dense_series({datetime(2026, 3, 2): (100, 40)}, 'week',
+                          START, START + timedelta(days=16))
+    assert weekly['dates'] == ['2026-02-23', '2026-03-02', '2026-03-09', '2026-03-16']
+    assert weekly['net'] == [0, 60, 0, 0]
+
+    monthly = dense_series({datetime(2026, 1, 1): (0, 25)}, 'month',
+                           datetime(2025, 11, 15), datetime(2026, 2, 3))
+    assert monthly['dates'] == ['2025-11-01', '2025-12-01', '2026-01-01', '2026-02-01']
+    assert monthly['expense'] == [0, 0, 25, 0]
+
+
+@pytest.mark.parametrize('granularity', ['day', 'week', 'month'])
+def test_bucket_totals_match_rollups(db, granularity):
+    # The $dateTrunc path is what series and forecasts use without rollups
+    from models.rollup import SpendRollup
+    documents = [{**document, 'userId': 'test@example.com'} for document in DOCUMENTS]
+    db.transactions.insert_many(documents)
+    SpendRollup.record_many(documents)
+    end = START + timedelta(days=40)
+
+    try:
+        totals = bucket_totals('test@example.com', granularity, START - timedelta(days=10), end)
+    except OperationFailure:
+        pytest.skip('server (or mongomock) lacks $dateTrunc')
+
+    assert totals == SpendRollup.series('test@example.com', granularity,
+                                        START - timedelta(days=10), end)
+
+
+def test_dashboard_uses_engine_without_rollups(client, db, auth_headers, monkeypatch):
+    monkeypatch.setattr(Config, 'SPEND_ROLLUPS', False)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 100})
+    db.transactions.insert_many([
+        {**document, 'userId': 'test@example.com', 'date': today}
+        for document in DOCUMENTS])
+
+    data = client.get('/api/dashboard?timeRange=week',
+                      headers=auth_headers).get_json()
+
+    assert data['income'] == 1700
+    assert data['expenses'] == 141
+
+
+def test_series_is_zero_filled_from_rollups(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(Config, 'SPEND_ROLLUPS', True)
+    today = datetime.now()
+    for days_ago, amount, category in ((0, 40, 'food'), (0, 300, 'income'), (20, 15, 'food')):
+        client.post('/api/transactions', headers=auth_headers, json={
+            'amount': amount, 'category': category, 'description': 'x',
+            'date': (today - timedelta(days=days_ago)).strftime('%Y-%m-%d')})
+
+    daily = client.get('/api/dashboard/series?granularity=day',
+                       headers=auth_headers).get_json()
+    assert len(daily['dates']) == 31
+    assert daily['dates'][-1] == today.strftime('%Y-%m-%d')
+    assert daily['income'][-1] == 300 and daily['expense'][-1] == 40
+    assert daily['net'][-21] == -15
+    assert sum(daily['expense']) == 55
+
+    weekly = client.get('/api/dashboard/series?granularity=week',
+                        headers=auth_headers).get_json()
+    assert sum(weekly['net']) == 245
+    assert all(datetime.strptime(d, '%Y-%m-%d').weekday() == 0 for d in weekly['dates'])
+
+    bad = client.get('/api/dashboard/series?granularity=hour', headers=auth_headers)
+    assert bad.status_code == 400
@@ -0,0 +1,180 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('hypercorn')
+
+
+def call(application, path, method='GET', query=b'', headers=()):
+    # Drive one request through the ASGI callable and collect the response
+    sent = []
+    requested = False
+    done = None
+
+    async def receive():
+        # The request body once, then a disconnect after the response is sent
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body'):
+            done.set()
+
+    async def run():
+        nonlocal done
+        done = asyncio.Event()
+        await application(scope, receive, send)
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+             'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+             'query_string': query, 'root_path': '', 'headers': list(headers),
+             'client': ('127.0.0.1', 1234), 'server': ('localhost', 80)}
+    asyncio.run(run())
+    start = next(m for m in sent if m['type'] == 'http.response.start')
+    body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+    headers = {k.decode().lower(): v.decode() for k, v in start.get('headers', [])}
+    return start['status'], body, headers
+
+
+def test_dispatch_splits_native_and_flask_routes(app):
+    import asgi
+
+    assert asgi._is_native({'path': '/api/dashboard', 'method': 'GET'})
+    assert asgi._is_native({'path': '/api/transactions', 'method': 'GET'})
+    # Writes, other routes and queued analysis jobs stay on Flask
+    assert not asgi._is_native({'path': '/api/transactions', 'method': 'POST'})
+    assert not asgi._is_native({'path': '/api/budgets', 'method': 'GET'})
+    assert not asgi._is_native({'path': '/api/analyze-transactions', 'method': 'GET',
+                                'query_string': b'async=true'})
+
+
+def test_native_routes_require_a_token(app):
+    import asgi
+
+    status, body, _ = call(asgi.application, '/api/dashboard')
+    assert status == 401
+    assert b'Missing Authorization Header' in body
+
+
+def test_other_routes_fall_back_to_flask(app, auth_headers):
+    import asgi
+
+    headers = [(k.lower().encode(), v.encode()) for k, v in auth_headers.items()]
+    status, body, _ = call(asgi.application, '/api/budgets', headers=headers)
+    assert status == 200
+    assert body.strip() == b'[]'
+
+
+class AsyncCursor:
+    # Just enough of pymongo's async cursor over a mongomock cursor
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+
+class AsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    async def aggregate(self, pipeline, **kwargs):
+        return AsyncCursor(self.collection.aggregate(pipeline, **kwargs))
+
+
+class AsyncDatabase:
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.db[name])
+
+
+@pytest.fixture
+def native(app, db, client, auth_headers, monkeypatch):
+    # The ASGI app on the same (mongomock) data as the Flask test client,
+    # with a helper fetching a path from both; returns both bodies and the
+    # next-page cursor they agreed on
+    import app as app_module
+    import asgi
+    monkeypatch.setattr(asgi, 'get_async_database', lambda: AsyncDatabase(db))
+    headers = [(k.lower().encode(), v.encode()) for k, v in auth_headers.items()]
+
+    def both(path, **params):
+        app_module.dashboard_cache.backend.clear()
+        flask_response = client.get(path, query_string=params, headers=auth_headers)
+        app_module.dashboard_cache.backend.clear()
+        status, body, response_headers = call(asgi.application, path, headers=headers,
+                                              query=urlencode(params).encode())
+        assert status == flask_response.status_code
+        assert response_headers.get('x-next-cursor') == flask_response.headers.get('X-Next-Cursor')
+        return json.loads(body), flask_response.get_json(), response_headers.get('x-next-cursor')
+
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    today = datetime.now()
+    for days_ago, amount, category in ((0, 40, 'food'), (0, 300, 'income'), (3, 12, 'food'),
+                                       (20, 15, 'fun'), (45, 80, 'rent'), (45, 500, 'income')):
+        client.post('/api/transactions', headers=auth_headers, json={
+            'amount': amount, 'category': category, 'description': f'{category} {days_ago}',
+            'date': (today - timedelta(days=days_ago)).strftime('%Y-%m-%d')})
+    return both
+
+
+@pytest.mark.parametrize('rollups', [True, False])
+def test_native_dashboard_matches_flask(native, monkeypatch, rollups):
+    from config import Config
+    monkeypatch.setattr(Config, 'SPEND_ROLLUPS', rollups)
+
+    for time_range in ('week', 'month', 'year'):
+        async_data, flask_data, _ = native('/api/dashboard', timeRange=time_range)
+        assert async_data == flask_data
+    assert flask_data['income'] == 800
+
+
+def test_native_transactions_match_flask(native):
+    async_data, flask_data, cursor = native('/api/transactions')
+    assert async_data == flask_data and len(flask_data) == 6 and cursor is None
+
+    # Page by page, following the same cursor
+    async_page, flask_page, cursor = native('/api/transactions', limit=4)
+    assert async_page == flask_page and len(flask_page) == 4
+    async_page, flask_page, cursor = native('/api/transactions', limit=4, cursor=cursor)
+    assert async_page == flask_page and len(flask_page) == 2 and cursor is None
+
+
+def test_native_local_analysis_matches_flask(native):
+    async_data, flask_data, _ = native('/api/analyze-transactions', source='local')
+    assert async_data == flask_data
+
+
+def test_native_routes_are_measured(native):
+    from metrics import registry
+    registry.reset()
+
+    native('/api/dashboard')
+
+    text = registry.render()
+    assert 'http_requests_total{method="GET",route="/api/dashboard",status="200"} 2' in text
@@ -0,0 +1,46 @@
+import passwords
+from config import Config
+
+
+def register_and_login(client, password='secret'):
+    client.post('/auth/register', json={
+        'name': 'Test', 'email': 'test@example.com', 'password': password})
+    return client.post('/auth/login', json={'email': 'test@example.com', 'password': password})
+
+
+def test_login_rehashes_when_hasher_changes(client, db, monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_HASHER', 'pbkdf2')
+    monkeypatch.setattr(Config, 'PASSWORD_PBKDF2_ITERATIONS', 1000)
+    assert register_and_login(client).status_code == 200
+    assert db.users.find_one()['password_hash'].startswith('pbkdf2:sha256:1000$')
+
+    monkeypatch.setattr(Config, 'PASSWORD_HASHER', 'bcrypt')
+    monkeypatch.setattr(Config, 'PASSWORD_BCRYPT_ROUNDS', 4)
+    assert client.post('/auth/login', json={
+        'email': 'test@example.com', 'password': 'secret'}).status_code == 200
+    stored = db.users.find_one()['password_hash']
+    assert stored.startswith('$2b$04$') and not passwords.needs_rehash(stored)
+
+    assert client.post('/auth/login', json={
+        'email': 'test@example.com', 'password': 'wrong'}).status_code == 401
+
+
+def test_saturated_hashing_pool_answers_503(client, monkeypatch):
+    monkeypatch.setattr(Config, 'PASSWORD_HASHER', 'pbkdf2')
+    monkeypatch.setattr(Config, 'PASSWORD_PBKDF2_ITERATIONS', 1000)
+    register_and_login(client)
+
+    monkeypatch.setattr(Config, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    passwords._get_executor()
+    slots = passwords._slots
+    held = 0
+    while slots.acquire(blocking=False):
+        held += 1
+    try:
+        response = client.post('/auth/login', json={
+            'email': 'test@example.com', 'password': 'secret'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        for _ in range(held):
+            slots.release()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import Config
+from models.rollup import SpendRollup
+
+
+@pytest.fixture(params=[True, False], ids=['rollups', 'aggregation'])
+def spend_source(request, monkeypatch):
+    monkeypatch.setattr(Config, 'SPEND_ROLLUPS', request.param)
+
+
+def test_get_budgets_sums_spend_per_period(client, db, auth_headers, spend_source):
+    now = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    db.budgets.insert_many([
+        {'userId': 'test@example.com', 'category': 'food',
+            'amount': 100, 'period': 'daily'},
+        {'userId': 'test@example.com', 'category': 'rent',
+            'amount': 1000, 'period': 'yearly'},
+    ])
+    db.transactions.insert_many([
+        {'userId': 'test@example.com', 'category': 'food', 'amount': -20.7,
+            'date': now},
+        {'userId': 'test@example.com', 'category': 'food', 'amount': -50,
+            'date': now - timedelta(days=400)},
+        {'userId': 'test@example.com', 'category': 'rent', 'amount': -900,
+            'date': now},
+        {'userId': 'other@example.com', 'category': 'rent', 'amount': -900,
+            'date': now},
+    ])
+    SpendRollup.rebuild()
+
+    response = client.get('/api/budgets', headers=auth_headers)
+
+    assert response.status_code == 200
+    spent = {b['category']: b['spent'] for b in response.get_json()}
+    assert spent == {'food': -20, 'rent': -900}
+
+
+def test_get_budgets_without_transactions(client, db, auth_headers, spend_source):
+    db.budgets.insert_one({'userId': 'test@example.com', 'category': 'food',
+                           'amount': 100, 'period': 'monthly'})
+
+    response = client.get('/api/budgets', headers=auth_headers)
+
+    assert response.get_json()[0]['spent'] == 0
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import app as app_module
+from cache import FileCacheBackend, LRUCacheBackend, ResponseCache
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUCacheBackend(max_entries=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+
+    assert backend.get('b') is None
+    assert backend.get('a') == 1
+
+
+def test_lru_entries_expire():
+    backend = LRUCacheBackend(ttl=-1)
+    backend.set('a', 1)
+
+    assert backend.get('a') is None
+
+
+def test_file_backend_shares_entries(tmp_path):
+    FileCacheBackend(str(tmp_path)).set('k', {'value': [1, 2]})
+
+    assert FileCacheBackend(str(tmp_path)).get('k') == {'value': [1, 2]}
+
+
+def test_dashboard_cache_invalidated_by_transaction_write(client, db, auth_headers, monkeypatch):
+    cache = ResponseCache('dashboard', LRUCacheBackend())
+    monkeypatch.setattr(app_module, 'dashboard_cache', cache)
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+
+    first = client.get('/api/dashboard', headers=auth_headers).get_json()
+    again = client.get('/api/dashboard', headers=auth_headers).get_json()
+    assert again == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    client.post('/api/transactions', headers=auth_headers, json={
+        'description': 'Salary', 'amount': 500, 'category': 'income',
+        'date': datetime.now().strftime('%Y-%m-%d')})
+
+    after = client.get('/api/dashboard', headers=auth_headers).get_json()
+    assert after['income'] == 500
+    assert cache.misses == 2
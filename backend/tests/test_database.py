@@ -0,0 +1,35 @@
+import os
+
+import database
+
+
+def test_one_client_per_process(db):
+    first = database.get_client()
+
+    assert database.get_client() is first
+    assert database.get_database().client is first
+
+
+def test_forked_process_builds_its_own_client(db, monkeypatch):
+    parent = database.get_client()
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+
+    assert database.get_client() is not parent
+
+
+def test_pool_stats_track_checkouts():
+    stats = database.PoolStats()
+
+    class Event:
+        duration = 0.25
+
+    stats.connection_created(Event())
+    stats.connection_check_out_started(Event())
+    stats.connection_checked_out(Event())
+    snapshot = stats.snapshot()
+    assert snapshot['checkedOut'] == 1
+    assert snapshot['waitTimeMaxMs'] == 250.0
+
+    stats.connection_checked_in(Event())
+    assert stats.snapshot()['checkedOut'] == 0
+    assert stats.snapshot()['maxCheckedOut'] == 1
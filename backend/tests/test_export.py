@@ -0,0 +1,85 @@
+import gzip
+import io
+
+import pytest
+
+
+def seed(client, headers):
+    for amount, category, date in ((12.9, 'food', '2026-01-02'),
+                                   (1500, 'income', '2026-01-01')):
+        client.post('/api/transactions', headers=headers, json={
+            'description': f'{category}, misc', 'amount': amount,
+            'category': category, 'date': date})
+
+
+EXPECTED = (
+    'Date,Description,Category,Amount,Type\r\n'
+    '2026-01-02,"food, misc",food,12,Expense\r\n'
+    '2026-01-01,"income, misc",income,1500,Income\r\n'
+)
+
+
+def test_export_streams_csv(client, auth_headers):
+    seed(client, auth_headers)
+
+    response = client.get('/api/transactions/export', headers=auth_headers)
+
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'filename=transactions.csv' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True) == EXPECTED
+
+
+def test_export_gzip_is_optional(client, auth_headers):
+    seed(client, auth_headers)
+
+    response = client.get('/api/transactions/export?gzip=true',
+                          headers=auth_headers)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()).decode() == EXPECTED
+
+
+def test_parquet_export_round_trips_through_import(client, db, auth_headers):
+    pytest.importorskip('pyarrow')
+    seed(client, auth_headers)
+    exported = client.get('/api/transactions/export?format=parquet',
+                          headers=auth_headers).get_data()
+    db.transactions.delete_many({})
+    db.spend_rollups.delete_many({})
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+
+    response = client.post('/api/transactions/import', headers=auth_headers, data={
+        'file': (io.BytesIO(exported), 'history.parquet')})
+
+    assert response.status_code == 201
+    assert response.get_json() == {'imported': 2}
+    assert db.users.find_one()['totalBalance'] == 1500 - 12.9
+    assert client.get('/api/transactions/export', headers=auth_headers) \
+        .get_data(as_text=True) == EXPECTED
+    assert db.spend_rollups.find_one(
+        {'category': 'food', 'granularity': 'year'})['expenses'] == 12
+
+
+def test_import_rejects_invalid_rows(client, db, auth_headers):
+    pytest.importorskip('pyarrow')
+    csv_file = b'date,category,amount\n2026-01-01,food,12\nyesterday,food,3\n2026-01-02,,x\n'
+
+    response = client.post('/api/transactions/import', headers=auth_headers, data={
+        'file': (io.BytesIO(csv_file), 'bank.csv')})
+
+    assert response.status_code == 400
+    assert response.get_json()['rows'] == [1, 2]
+    assert db.transactions.count_documents({}) == 0
+
+
+@pytest.mark.parametrize('filename', ['bank.parquet', 'bank.arrow', 'bank.csv'])
+def test_import_rejects_malformed_file(client, db, auth_headers, filename):
+    pytest.importorskip('pyarrow')
+
+    response = client.post('/api/transactions/import', headers=auth_headers, data={
+        'file': (io.BytesIO(b'\x00garbage\xff\x01,,\n"x'), filename)})
+
+    assert response.status_code == 400
+    assert 'Could not read' in response.get_json()['error']
+    assert db.transactions.count_documents({}) == 0
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from analytics import forecast_goals
+
+
+def test_forecast_projects_deadline_hit_dates():
+    now = datetime(2026, 1, 1)
+    forecast = forecast_goals([1000, 5000, 100], [400, 0, 100],
+                              [datetime(2026, 12, 31), datetime(2026, 6, 30), now],
+                              [100, 300, 200], now)
+
+    assert forecast['savingsRate'] == 216.67
+    assert forecast['onTrack'] == [True, False, True]
+    assert forecast['projected'][2] == '2026-01-01'
+    assert forecast['requiredMonthly'][2] == 0
+
+
+def test_goal_progress_follows_linked_transactions(client, db, auth_headers):
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    today = datetime.now().strftime('%Y-%m-%d')
+    deadline = (datetime.now() + timedelta(days=365)).strftime('%Y-%m-%d')
+
+    def transfer(amount, **fields):
+        return client.post('/api/transactions', headers=auth_headers, json={
+            'amount': amount, 'category': 'savings', 'date': today, **fields}).get_json()
+
+    transfer(50)
+    client.post('/api/goals', headers=auth_headers, json={
+        'name': 'Holiday', 'targetAmount': 1000, 'currentAmount': 100,
+        'deadline': deadline, 'category': 'savings'})
+    client.post('/api/goals', headers=auth_headers, json={
+        'name': 'Bike', 'targetAmount': 200, 'deadline': deadline, 'tag': 'bike'})
+
+    first = transfer(150)
+    transfer(20, category='shopping', tags=['bike'])
+    goals = {g['name']: g for g in client.get('/api/goals', headers=auth_headers).get_json()}
+    assert goals['Holiday']['currentAmount'] == 300
+    assert goals['Holiday']['progress'] == 0.3
+    assert goals['Bike']['currentAmount'] == 20
+
+    # Served from the materialized document until a transaction write
+    assert db.goal_progress.count_documents({}) == 1
+    client.delete(f"/api/transactions/{first['_id']}", headers=auth_headers)
+    goals = {g['name']: g for g in client.get('/api/goals', headers=auth_headers).get_json()}
+    assert goals['Holiday']['currentAmount'] == 150
@@ -0,0 +1,22 @@
+from indexes import INDEXES, ensure_indexes, find_collscans
+
+
+def test_ensure_indexes_creates_unique_email(db):
+    ensure_indexes(db)
+
+    info = db.users.index_information()
+    assert info['email_unique']['unique'] is True
+    for collection, indexes in INDEXES.items():
+        names = db[collection].index_information()
+        assert all(index.document['name'] in names for index in indexes)
+
+
+def test_find_collscans_ignores_rejected_plans():
+    explain = {'queryPlanner': {
+        'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}},
+        'rejectedPlans': [{'stage': 'COLLSCAN'}]}}
+    assert find_collscans(explain) == []
+
+    explain = {'stages': [{'$cursor': {'queryPlanner': {
+        'winningPlan': {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}}}}]}
+    assert len(find_collscans(explain)) == 1
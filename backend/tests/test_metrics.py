@@ -0,0 +1,48 @@
+import json
+import logging
+from types import SimpleNamespace
+
+from config import Config
+from metrics import command_metrics, registry
+
+
+def test_requests_are_counted_and_slow_ones_logged(db, client, auth_headers,
+                                                   monkeypatch, caplog):
+    registry.reset()
+    monkeypatch.setattr(Config, 'SLOW_REQUEST_MS', 0)
+    monkeypatch.setattr(Config, 'INTERNAL_TOKEN', 'scrape-token')
+
+    # mongomock emits no command events, so emit one as the route queries
+    budgets = db.budgets
+
+    class Instrumented:
+        def find(self, *args, **kwargs):
+            command_metrics.succeeded(SimpleNamespace(command_name='find', duration_micros=1500))
+            return budgets.find(*args, **kwargs)
+
+    monkeypatch.setattr(db, 'budgets', Instrumented(), raising=False)
+    with caplog.at_level(logging.WARNING, logger='slow_requests'):
+        client.get('/api/budgets', headers=auth_headers)
+
+    slow = json.loads(caplog.records[-1].getMessage())
+    assert slow['route'] == '/api/budgets'
+    assert slow['dbCommands'] == 1 and slow['dbMs'] == 1.5
+    assert slow['bytes'] == len(b'[]\n')
+
+    text = client.get('/internal/metrics', headers={
+        'Authorization': 'Bearer scrape-token'}).get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/api/budgets",status="200"} 1' in text
+    assert 'mongo_commands_total{command="find",outcome="ok"}' in text
+    assert 'http_request_db_commands_count{method="GET",route="/api/budgets"} 1' in text
+
+
+def test_internal_endpoints_need_the_internal_token(client, monkeypatch):
+    for path in ('/internal/metrics', '/internal/pool-stats', '/internal/cache-stats'):
+        assert client.get(path).status_code == 404
+
+    monkeypatch.setattr(Config, 'INTERNAL_TOKEN', 'scrape-token')
+    for path in ('/internal/metrics', '/internal/pool-stats', '/internal/cache-stats'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+        assert client.get(path, headers={
+            'Authorization': 'Bearer scrape-token'}).status_code == 200
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from indexes import ensure_indexes
+
+
+def spend(client, headers, amount, category='food'):
+    client.post('/api/transactions', headers=headers, json={
+        'description': 'Groceries', 'amount': amount, 'category': category,
+        'date': datetime.now().strftime('%Y-%m-%d')})
+
+
+def test_exceeded_budget_notifies_once_per_period(client, db, auth_headers):
+    ensure_indexes(db)
+    client.post('/api/budgets', headers=auth_headers, json={
+        'category': 'food', 'amount': 100, 'period': 'monthly'})
+
+    spend(client, auth_headers, 60)
+    assert db.notifications.count_documents({}) == 0
+
+    spend(client, auth_headers, 60)
+    spend(client, auth_headers, 30)
+    notifications = list(db.notifications.find())
+    assert len(notifications) == 1
+    assert notifications[0]['spent'] == 150
+    assert notifications[0]['read'] is False
+    assert 'Spent: $150.00, Limit: $100.00' in notifications[0]['message']
+
+
+def test_reading_budgets_never_writes(client, db, auth_headers):
+    client.post('/api/budgets', headers=auth_headers, json={
+        'category': 'food', 'amount': 10, 'period': 'monthly'})
+    spend(client, auth_headers, 50)
+    db.notifications.delete_many({})
+
+    for _ in range(3):
+        client.get('/api/budgets', headers=auth_headers)
+
+    assert db.notifications.count_documents({}) == 0
+
+
+def test_feed_pagination_unread_counter_and_mark_read(client, db, auth_headers):
+    for category in ('food', 'rent', 'fun'):
+        client.post('/api/budgets', headers=auth_headers, json={
+            'category': category, 'amount': 1, 'period': 'monthly'})
+        spend(client, auth_headers, 5, category)
+
+    first = client.get('/api/notifications?limit=2', headers=auth_headers)
+    assert len(first.get_json()) == 2
+    rest = client.get('/api/notifications', headers=auth_headers,
+                      query_string={'cursor': first.headers['X-Next-Cursor']})
+    assert len(rest.get_json()) == 1
+    assert 'X-Next-Cursor' not in rest.headers
+
+    count = client.get('/api/notifications/unread-count', headers=auth_headers)
+    assert count.get_json() == {'unread': 3}
+
+    read = client.post('/api/notifications/read', headers=auth_headers,
+                       json={'ids': [first.get_json()[0]['_id']]})
+    assert read.get_json() == {'updated': 1, 'unread': 2}
+
+    read = client.post('/api/notifications/read', headers=auth_headers,
+                       json={'all': True})
+    assert read.get_json() == {'updated': 2, 'unread': 0}
+    assert db.notifications.count_documents({'readAt': {'$exists': True}}) == 3
+
+
+def test_unread_counter_initialized_from_existing_notifications(client, db, auth_headers):
+    db.notifications.insert_many([
+        {'userId': 'test@example.com', 'read': False, 'createdAt': datetime.now()},
+        {'userId': 'test@example.com', 'read': True, 'createdAt': datetime.now()}])
+
+    count = client.get('/api/notifications/unread-count', headers=auth_headers)
+
+    assert count.get_json() == {'unread': 1}
+
+
+def test_budget_amounts_that_are_not_integers(client, db, auth_headers):
+    client.post('/api/budgets', headers=auth_headers, json={
+        'category': 'food', 'amount': '150.50', 'period': 'monthly'})
+    client.post('/api/budgets', headers=auth_headers, json={
+        'category': 'travel', 'amount': None, 'period': 'monthly'})
+
+    spend(client, auth_headers, 200)
+    response = client.post('/api/transactions', headers=auth_headers, json={
+        'description': 'Train', 'amount': 50, 'category': 'travel',
+        'date': datetime.now().strftime('%Y-%m-%d')})
+    assert response.status_code == 201
+
+    notifications = list(db.notifications.find())
+    assert [n['category'] for n in notifications] == ['food']
+    assert 'Limit: $150.50' in notifications[0]['message']
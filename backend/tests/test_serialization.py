@@ -0,0 +1,34 @@
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+from bson import Decimal128, ObjectId
+
+import serialization
+
+
+def document():
+    return {'_id': ObjectId('6ad3c525eaca99c9ffd79335'),
+            'date': datetime(2026, 10, 17), 'createdAt': datetime(2026, 10, 17, 9, 30, 1, 250),
+            'amount': Decimal('12.30'), 'balance': Decimal128('99.95'),
+            'total': np.float64(1.5), 'counts': {1: 'a'}}
+
+
+EXPECTED = {'_id': '6ad3c525eaca99c9ffd79335', 'date': '2026-10-17T00:00:00',
+            'createdAt': '2026-10-17T09:30:01.000250', 'amount': '12.30',
+            'balance': '99.95', 'total': 1.5, 'counts': {'1': 'a'}}
+
+
+def test_provider_serializes_mongo_documents(app):
+    assert app.json.loads(app.json.dumps(document())) == EXPECTED
+
+    with app.app_context():
+        response = app.json.response([document()])
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == [EXPECTED]
+
+
+def test_standard_library_fallback_matches(app, monkeypatch):
+    monkeypatch.setattr(serialization, 'orjson', None)
+
+    assert app.json.loads(app.json.dumps(document())) == EXPECTED
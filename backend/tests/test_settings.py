@@ -0,0 +1,58 @@
+from flask_jwt_extended import decode_token
+
+from config import Config
+
+
+def test_settings_are_cached_until_updated(client, db, auth_headers, monkeypatch):
+    # Only a shared backend caches settings; pretend the memory one is
+    import app as app_module
+    monkeypatch.setattr(app_module.profile_cache.backend, 'shared', True)
+    assert client.get('/api/settings', headers=auth_headers).status_code == 404
+
+    client.put('/api/settings', headers=auth_headers,
+               json={'defaultCurrency': 'EUR', 'language': 'de'})
+    assert client.get('/api/settings', headers=auth_headers).get_json()['defaultCurrency'] == 'EUR'
+
+    # A second read is served from the cache, not Mongo
+    db.settings.update_one({}, {'$set': {'defaultCurrency': 'stale'}})
+    assert client.get('/api/settings', headers=auth_headers).get_json()['defaultCurrency'] == 'EUR'
+
+    client.put('/api/settings', headers=auth_headers,
+               json={'defaultCurrency': 'USD', 'language': 'en'})
+    assert client.get('/api/settings', headers=auth_headers).get_json()['defaultCurrency'] == 'USD'
+
+
+def test_settings_are_not_cached_per_worker(client, db, auth_headers):
+    # Another worker's PUT cannot evict this worker's memory cache, so a
+    # change made behind its back must still be read
+    client.put('/api/settings', headers=auth_headers,
+               json={'defaultCurrency': 'EUR', 'language': 'de'})
+    client.get('/api/settings', headers=auth_headers)
+
+    db.settings.update_one({}, {'$set': {'defaultCurrency': 'USD'}})
+    assert client.get('/api/settings', headers=auth_headers).get_json()['defaultCurrency'] == 'USD'
+
+
+def test_profile_hides_password_hash(client, auth_headers):
+    client.post('/auth/register', json={
+        'name': 'Test', 'email': 'test@example.com', 'password': 'secret'})
+
+    profile = client.get('/api/profile', headers=auth_headers).get_json()
+    assert profile['email'] == 'test@example.com'
+    assert 'password_hash' not in profile
+
+
+def test_login_embeds_settings_claims(app, client, monkeypatch):
+    monkeypatch.setattr(Config, 'JWT_SETTINGS_CLAIMS', True)
+    client.post('/auth/register', json={
+        'name': 'Test', 'email': 'test@example.com', 'password': 'secret'})
+    token = client.post('/auth/login', json={
+        'email': 'test@example.com', 'password': 'secret'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    updated = client.put('/api/settings', headers=headers,
+                         json={'defaultCurrency': 'INR', 'language': 'hi'}).get_json()
+    with app.app_context():
+        claims = decode_token(updated['access_token'])
+    assert claims['currency'] == 'INR' and claims['language'] == 'hi'
+    assert claims['name'] == 'Test'
@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Serverless deployments import the app on every cold start
+COLD_START_BUDGET_SECONDS = float(os.environ.get('COLD_START_BUDGET_SECONDS', '3.0'))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - started
+import database
+print(json.dumps({'seconds': elapsed, 'client': database._client is not None,
+                  'modules': sorted(m for m in ('numpy', 'openai', 'pyarrow', 'tiktoken', 'redis')
+                                    if m in sys.modules)}))
+"""
+
+
+def test_cold_start_is_lean_and_within_budget():
+    # A fresh interpreter, so nothing imported by other tests is counted
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=BACKEND, env=os.environ,
+                            capture_output=True, text=True, check=True).stdout
+    probe = json.loads(output.splitlines()[-1])
+
+    assert probe['modules'] == []
+    assert not probe['client'], 'importing the app must not connect to Mongo'
+    assert probe['seconds'] < COLD_START_BUDGET_SECONDS
+
+
+def test_create_app_builds_independent_apps(app):
+    import app as app_module
+
+    other = app_module.create_app()
+    assert other is not app
+    assert sorted(r.rule for r in other.url_map.iter_rules()) == \
+        sorted(r.rule for r in app.url_map.iter_rules())
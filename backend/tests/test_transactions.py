@@ -0,0 +1,170 @@
+from datetime import datetime
+
+from models.rollup import SpendRollup
+
+
+def create(client, headers, **fields):
+    payload = {'description': 'Lunch', 'amount': 12.5, 'category': 'food',
+               'date': datetime.now().strftime('%Y-%m-%d'), **fields}
+    return client.post('/api/transactions', json=payload, headers=headers)
+
+
+def rollup(db, granularity='month', category='food'):
+    return db.spend_rollups.find_one(
+        {'userId': 'test@example.com', 'category': category, 'granularity': granularity})
+
+
+def test_write_routes_maintain_rollups(client, db, auth_headers):
+    first = create(client, auth_headers).get_json()
+    create(client, auth_headers, amount=30)
+    assert rollup(db)['expenses'] == 42
+    assert rollup(db, 'year')['count'] == 2
+
+    client.put(f"/api/transactions/{first['_id']}", json={'amount': 2},
+               headers=auth_headers)
+    assert rollup(db)['expenses'] == 32
+
+    client.delete(f"/api/transactions/{first['_id']}", headers=auth_headers)
+    assert rollup(db)['expenses'] == 30
+    assert rollup(db, 'day')['count'] == 1
+
+
+def test_rebuild_matches_incremental_rollups(client, db, auth_headers):
+    create(client, auth_headers)
+    create(client, auth_headers, amount=1000, category='income')
+    incremental = sorted((r['category'], r['granularity'], r['income'], r['expenses'])
+                         for r in db.spend_rollups.find())
+
+    SpendRollup.rebuild('test@example.com')
+
+    rebuilt = sorted((r['category'], r['granularity'], r['income'], r['expenses'])
+                     for r in db.spend_rollups.find())
+    assert rebuilt == incremental
+
+
+def test_dashboard_reads_rollups(client, db, auth_headers):
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    create(client, auth_headers, amount=40)
+    create(client, auth_headers, amount=100, category='income')
+
+    data = client.get('/api/dashboard?timeRange=month',
+                      headers=auth_headers).get_json()
+
+    assert data['income'] == 100
+    assert data['expenses'] == 40
+    assert data['spendingByCategory'] == [{'name': 'food', 'value': 40}]
+    assert data['totalBalance'] == 60
+
+
+def test_list_pages_through_transactions_with_cursor(client, db, auth_headers):
+    for day in (1, 2, 2, 3, 5):
+        create(client, auth_headers, date=f'2026-01-0{day}')
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/transactions', query_string=params,
+                              headers=auth_headers)
+        page = response.get_json()
+        assert len(page) <= 2
+        seen.extend(page)
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert len({t['_id'] for t in seen}) == 5
+    assert [t['date'][:10] for t in seen] == [
+        '2026-01-05', '2026-01-03', '2026-01-02', '2026-01-02', '2026-01-01']
+    assert seen[2]['time'] > seen[3]['time']
+
+
+def test_list_rejects_bad_cursor(client, auth_headers):
+    response = client.get('/api/transactions?cursor=not-a-cursor',
+                          headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_batch_inserts_all_or_nothing_with_one_balance_update(client, db, auth_headers):
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 100})
+    today = datetime.now().strftime('%Y-%m-%d')
+    batch = [
+        {'description': 'Salary', 'amount': 500, 'category': 'income', 'date': today},
+        {'description': 'Rent', 'amount': 300, 'category': 'housing', 'date': today},
+        {'description': 'Lunch', 'amount': -12, 'category': 'food', 'date': today},
+    ]
+
+    invalid = client.post('/api/transactions/batch', headers=auth_headers,
+                          json=batch + [{'amount': 'ten', 'category': 'food', 'date': today},
+                                        {'amount': 5, 'category': 'food', 'date': '05/01'}])
+    assert invalid.status_code == 400
+    assert invalid.get_json()['rows'] == [3, 4]
+    assert db.transactions.count_documents({}) == 0
+
+    response = client.post('/api/transactions/batch', headers=auth_headers,
+                           json={'transactions': batch})
+    assert response.status_code == 201
+    assert response.get_json()['created'] == 3
+    user = db.users.find_one({'email': 'test@example.com'})
+    assert user['totalBalance'] == 100 + 500 - 300 - 12
+    assert user['dataVersion'] == 1
+    assert rollup(db)['expenses'] == 12
+
+
+def test_reconciler_folds_ledger_and_repairs_drift(client, db, auth_headers):
+    from models.ledger import BalanceLedger
+
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    lunch = create(client, auth_headers).get_json()
+    create(client, auth_headers, amount=100, category='income')
+    assert db.balance_ledger.count_documents({}) == 2
+
+    # Nothing settled yet: the checkpoint waits and totalBalance is untouched
+    db.users.update_one({}, {'$set': {'totalBalance': 5}})
+    assert BalanceLedger.reconcile('test@example.com') == {}
+    assert db.balance.count_documents({}) == 0
+
+    assert BalanceLedger.reconcile(settle_seconds=-5) == {'test@example.com': 82.5}
+    assert db.users.find_one()['totalBalance'] == 87.5
+
+    client.delete(f"/api/transactions/{lunch['_id']}", headers=auth_headers)
+    db.transactions.delete_many({})  # later runs read only the ledger
+    BalanceLedger.reconcile('test@example.com', settle_seconds=-5)
+    assert db.balance.find_one()['balance'] == 100
+    assert db.users.find_one()['totalBalance'] == 100
+
+
+def test_reconciler_first_run_skips_writes_during_the_sum(client, db, auth_headers,
+                                                          monkeypatch):
+    from models.ledger import BalanceLedger
+
+    db.users.insert_one({'email': 'test@example.com', 'totalBalance': 0})
+    create(client, auth_headers, amount=100, category='income')
+    full_balance = BalanceLedger._full_balance
+
+    def sum_during_write(user_id):
+        # The sum sees a transaction whose ledger entry lands just after it
+        create(client, auth_headers, amount=50, category='income')
+        return full_balance(user_id)
+
+    monkeypatch.setattr(BalanceLedger, '_full_balance', staticmethod(sum_during_write))
+    assert BalanceLedger.reconcile('test@example.com', settle_seconds=-5) == {}
+    assert db.balance.count_documents({}) == 0
+
+    monkeypatch.setattr(BalanceLedger, '_full_balance', staticmethod(full_balance))
+    BalanceLedger.reconcile('test@example.com', settle_seconds=-5)
+    BalanceLedger.reconcile('test@example.com', settle_seconds=-5)
+    assert db.balance.find_one()['balance'] == 150
+    assert db.users.find_one()['totalBalance'] == 150
+
+
+def test_list_without_limit_returns_everything(client, auth_headers, monkeypatch):
+    # Clients that predate paging do not follow X-Next-Cursor
+    import app as app_module
+    monkeypatch.setattr(app_module, 'DEFAULT_PAGE_SIZE', 3)
+    for day in range(1, 10):
+        create(client, auth_headers, date=f'2026-01-0{day}')
+
+    response = client.get('/api/transactions', headers=auth_headers,
+                          query_string={'start_date': '2026-01-01', 'end_date': '2026-01-31'})
+    assert len(response.get_json()) == 9
+    assert 'X-Next-Cursor' not in response.headers